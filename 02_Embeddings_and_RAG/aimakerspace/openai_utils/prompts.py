@@ -1,13 +1,180 @@
 import re
-from typing import Dict, List, Any, Optional, Union, Callable
+from functools import lru_cache
+from itertools import repeat
+from string import Formatter
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple, Union, Callable
 from abc import ABC, abstractmethod
 
+_PLACEHOLDER = re.compile(r"\{([^}]+)\}")
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
 
 class PromptValidationError(Exception):
     """Raised when prompt validation fails"""
     pass
 
 
+class CompiledTemplate(NamedTuple):
+    """
+    A ``str.format`` template split once into literal text and placeholders.
+
+    ``literals[i]`` is followed by ``fields[i]`` (name, format spec,
+    conversion), or by nothing when the field is None. ``simple`` is set
+    when no field uses a spec or conversion, so rendering is just ``str``.
+    """
+
+    literals: Tuple[str, ...]
+    fields: Tuple[Optional[Tuple[str, str, Optional[str]]], ...]
+    simple: bool
+    variables: Tuple[str, ...]
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """Substitutes ``values`` (missing names render as "") in a single join."""
+        get = values.get
+        if self.simple:
+            rendered = ["" if f is None else str(get(f[0], "")) for f in self.fields]
+        else:
+            rendered = [
+                "" if f is None else _format_field(get(f[0], ""), f[1], f[2])
+                for f in self.fields
+            ]
+        parts = [None] * (2 * len(self.literals))
+        parts[0::2] = self.literals
+        parts[1::2] = rendered
+        return "".join(parts)
+
+    def render_columns(self, columns: Dict[str, List[Any]], n_rows: int) -> List[str]:
+        """Renders ``n_rows`` outputs from per-variable value columns, column by column."""
+        if not any(self.fields):
+            return ["".join(self.literals)] * n_rows
+        pieces = []
+        for literal, field in zip(self.literals, self.fields):
+            if literal:
+                pieces.append(repeat(literal))
+            if field is None:
+                continue
+            values = columns.get(field[0]) or repeat("", n_rows)
+            if self.simple or not (field[1] or field[2]):
+                pieces.append(map(str, values))
+            else:
+                pieces.append([_format_field(v, field[1], field[2]) for v in values])
+        return ["".join(row) for row in zip(*pieces)]
+
+
+def _frame_column(series: Any, default: Any) -> List[Any]:
+    """A DataFrame column as Python values, with missing cells replaced by ``default``."""
+    missing = series.isna()
+    if not missing.any():
+        return series.tolist()
+    # A gap upcasts an int column to float; convert_dtypes restores the ints
+    values = series.convert_dtypes().astype(object).tolist()
+    return [default if gap else value for value, gap in zip(values, missing.tolist())]
+
+
+def _as_columns(rows: Any, names: Tuple[str, ...], defaults: Dict[str, Any]) -> Tuple[Dict[str, List[Any]], int]:
+    """
+    Turns a list of variable dicts or a pandas DataFrame into one value list
+    per template variable; a variable missing from a row, or a missing (NaN)
+    DataFrame cell, falls back to ``defaults`` and then to "".
+    """
+    if hasattr(rows, "columns") and hasattr(rows, "to_dict"):
+        n_rows = len(rows)
+        columns = {}
+        for name in set(names):
+            if name in rows.columns:
+                columns[name] = _frame_column(rows[name], defaults.get(name, ""))
+            else:
+                columns[name] = [defaults.get(name, "")] * n_rows
+        return columns, n_rows
+    rows = list(rows)
+    columns = {
+        name: [row.get(name, defaults.get(name, "")) for row in rows] for name in set(names)
+    }
+    return columns, len(rows)
+
+
+def _format_field(value: Any, spec: str, conversion: Optional[str]) -> str:
+    if conversion:
+        value = _CONVERSIONS[conversion](value)
+    return format(value, spec)
+
+
+@lru_cache(maxsize=512)
+def compile_template(template: str) -> CompiledTemplate:
+    """Parses ``template`` once; repeated prompts share the cached result."""
+    literals, fields = [], []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        literals.append(literal)
+        fields.append(None if name is None else (name, spec or "", conversion))
+    return CompiledTemplate(
+        literals=tuple(literals),
+        fields=tuple(fields),
+        simple=all(f is None or not (f[1] or f[2]) for f in fields),
+        variables=tuple(_PLACEHOLDER.findall(template)),
+    )
+
+
+_VARIABLE = re.compile(r'\{([^{}]+)\}')
+_CONDITIONAL = re.compile(r'\{if\s+([^}]+)\}(.*?)(?:\{else\}(.*?))?\{/if\}', re.DOTALL)
+_COMPARISONS = ['>', '<', '>=', '<=', '!=']
+
+
+class _Text(NamedTuple):
+    """Literal text with ``{variable}`` slots: literals[i] precedes names[i]."""
+    literals: Tuple[str, ...]
+    names: Tuple[str, ...]
+
+
+class _Conditional(NamedTuple):
+    condition: str
+    test: Tuple
+    then: _Text
+    otherwise: _Text
+
+
+def _split_variables(text: str) -> _Text:
+    literals, names, position = [], [], 0
+    for match in _VARIABLE.finditer(text):
+        literals.append(text[position:match.start()])
+        names.append(match.group(1))
+        position = match.end()
+    literals.append(text[position:])
+    return _Text(tuple(literals), tuple(names))
+
+
+@lru_cache(maxsize=1024)
+def _parse_condition(condition: str) -> Tuple:
+    """Pre-parses a condition into ('eq', left, right), ('cmp', op, left, right) or ('truthy',)."""
+    if '==' in condition:
+        parts = condition.split('==')
+        if len(parts) == 2:
+            return ('eq', parts[0].strip(), parts[1].strip().strip('"').strip("'"))
+    for op in _COMPARISONS:
+        if op in condition:
+            parts = condition.split(op)
+            if len(parts) == 2:
+                return ('cmp', op, parts[0].strip(), parts[1].strip())
+    return ('truthy',)
+
+
+@lru_cache(maxsize=256)
+def _compile_conditional(template: str) -> Tuple[Union[_Text, _Conditional], ...]:
+    """Splits a ConditionalPrompt template into text runs and conditional nodes."""
+    nodes, position = [], 0
+    for match in _CONDITIONAL.finditer(template):
+        nodes.append(_split_variables(template[position:match.start()]))
+        condition = match.group(1).strip()
+        nodes.append(_Conditional(
+            condition,
+            _parse_condition(condition),
+            _split_variables(match.group(2).strip()),
+            _split_variables(match.group(3).strip() if match.group(3) else ""),
+        ))
+        position = match.end()
+    nodes.append(_split_variables(template[position:]))
+    return tuple(nodes)
+
+
 class ConditionalPrompt:
     """Enhanced prompt with conditional logic support"""
     
@@ -27,80 +194,81 @@ class ConditionalPrompt:
         self.prompt = prompt
         self.strict = strict
         self.defaults = defaults or {}
-        self._var_pattern = re.compile(r'\{([^{}]+)\}')
-        self._conditional_pattern = re.compile(r'\{if\s+([^}]+)\}(.*?)(?:\{else\}(.*?))?\{/if\}', re.DOTALL)
+        self._var_pattern = _VARIABLE
+        self._conditional_pattern = _CONDITIONAL
         
     def format_prompt(self, **kwargs) -> str:
         """Format prompt with conditional logic evaluation"""
-        merged_kwargs = {**self.defaults, **kwargs}
+        merged_kwargs = {**self.defaults, **kwargs} if self.defaults else kwargs
         
-        # Process conditional statements
-        result = self._process_conditionals(self.prompt, merged_kwargs)
-        
-        # Process regular variables
-        variables = self._var_pattern.findall(result)
+        # Pick a branch for every conditional; the template itself is parsed once
+        texts = []
+        for node in _compile_conditional(self.prompt):
+            if isinstance(node, _Conditional):
+                node = node.then if self._choose(node, merged_kwargs) else node.otherwise
+            texts.append(node)
         
         if self.strict:
-            missing_vars = set(variables) - set(merged_kwargs.keys())
+            missing_vars = {name for text in texts for name in text.names} - merged_kwargs.keys()
             if missing_vars:
                 raise PromptValidationError(f"Missing required variables: {missing_vars}")
         
-        # Format remaining variables
-        for var in variables:
-            value = merged_kwargs.get(var, "")
-            result = result.replace(f"{{{var}}}", str(value))
-            
-        return result
+        get = merged_kwargs.get
+        parts = []
+        for text in texts:
+            parts.append(text.literals[0])
+            for name, literal in zip(text.names, text.literals[1:]):
+                parts.append(str(get(name, "")))
+                parts.append(literal)
+        return "".join(parts)
     
     def _process_conditionals(self, text: str, context: Dict[str, Any]) -> str:
         """Process conditional statements in the text"""
-        def replace_conditional(match):
-            condition = match.group(1).strip()
-            true_content = match.group(2).strip()
-            false_content = match.group(3).strip() if match.group(3) else ""
-            
-            # Evaluate condition
-            try:
-                # Simple evaluation - check if variable exists and is truthy
-                if condition in context:
-                    condition_result = bool(context[condition])
-                else:
-                    # Try to evaluate as a simple expression
-                    condition_result = self._evaluate_condition(condition, context)
-                
-                return true_content if condition_result else false_content
-            except Exception:
-                return false_content
-        
-        return self._conditional_pattern.sub(replace_conditional, text)
+        parts = []
+        for node in _compile_conditional(text):
+            if isinstance(node, _Conditional):
+                node = node.then if self._choose(node, context) else node.otherwise
+            parts.append(node.literals[0])
+            for name, literal in zip(node.names, node.literals[1:]):
+                parts.append(f"{{{name}}}")
+                parts.append(literal)
+        return "".join(parts)
+    
+    def _choose(self, node: _Conditional, context: Dict[str, Any]) -> bool:
+        try:
+            # Simple evaluation - check if variable exists and is truthy
+            if node.condition in context:
+                return bool(context[node.condition])
+            # Try to evaluate as a simple expression
+            return self._test(node.condition, node.test, context)
+        except Exception:
+            return False
     
     def _evaluate_condition(self, condition: str, context: Dict[str, Any]) -> bool:
         """Evaluate simple conditions like 'var > 5' or 'var == "value"'"""
+        return self._test(condition, _parse_condition(condition), context)
+    
+    @staticmethod
+    def _test(condition: str, test: Tuple, context: Dict[str, Any]) -> bool:
+        kind = test[0]
         # Simple equality check
-        if '==' in condition:
-            parts = condition.split('==')
-            if len(parts) == 2:
-                left = parts[0].strip()
-                right = parts[1].strip().strip('"').strip("'")
-                return str(context.get(left, "")) == right
+        if kind == 'eq':
+            _, left, right = test
+            return str(context.get(left, "")) == right
         
         # Simple comparison
-        for op in ['>', '<', '>=', '<=', '!=']:
-            if op in condition:
-                parts = condition.split(op)
-                if len(parts) == 2:
-                    left = parts[0].strip()
-                    right = parts[1].strip()
-                    try:
-                        left_val = float(context.get(left, 0))
-                        right_val = float(right)
-                        if op == '>': return left_val > right_val
-                        elif op == '<': return left_val < right_val
-                        elif op == '>=': return left_val >= right_val
-                        elif op == '<=': return left_val <= right_val
-                        elif op == '!=': return left_val != right_val
-                    except (ValueError, TypeError):
-                        return False
+        if kind == 'cmp':
+            _, op, left, right = test
+            try:
+                left_val = float(context.get(left, 0))
+                right_val = float(right)
+                if op == '>': return left_val > right_val
+                elif op == '<': return left_val < right_val
+                elif op == '>=': return left_val >= right_val
+                elif op == '<=': return left_val <= right_val
+                elif op == '!=': return left_val != right_val
+            except (ValueError, TypeError):
+                return False
         
         # Default: check if variable exists and is truthy
         return bool(context.get(condition, False))
@@ -118,9 +286,14 @@ class BasePrompt:
         self.prompt = prompt
         self.strict = strict
         self.defaults = defaults or {}
-        self._pattern = re.compile(r"\{([^}]+)\}")
+        self._pattern = _PLACEHOLDER
         self._validate_template()
 
+    @property
+    def compiled(self) -> CompiledTemplate:
+        """The parsed template, recompiled only if ``prompt`` is reassigned."""
+        return compile_template(self.prompt)
+
     def _validate_template(self) -> None:
         """Validates the template syntax"""
         try:
@@ -137,19 +310,20 @@ class BasePrompt:
         :return: The formatted prompt string
         :raises PromptValidationError: If strict mode and required variables are missing
         """
-        variables = self.get_input_variables()
-        merged_kwargs = {**self.defaults, **kwargs}
+        try:
+            compiled = self.compiled
+        except ValueError as e:
+            raise PromptValidationError(f"Error formatting prompt: {e}")
+        merged_kwargs = {**self.defaults, **kwargs} if self.defaults else kwargs
         
         if self.strict:
-            missing_vars = set(variables) - set(merged_kwargs.keys())
+            missing_vars = set(compiled.variables) - merged_kwargs.keys()
             if missing_vars:
                 raise PromptValidationError(f"Missing required variables: {missing_vars}")
         
-        # Use defaults for missing variables
-        format_dict = {var: merged_kwargs.get(var, self.defaults.get(var, "")) for var in variables}
-        
+        # Missing variables render as ""; defaults are already merged in
         try:
-            return self.prompt.format(**format_dict)
+            return compiled.render(merged_kwargs)
         except (KeyError, ValueError) as e:
             raise PromptValidationError(f"Error formatting prompt: {e}")
 
@@ -159,7 +333,7 @@ class BasePrompt:
 
         :return: List of input variable names
         """
-        return self._pattern.findall(self.prompt)
+        return list(self.compiled.variables)
     
     def validate_inputs(self, **kwargs) -> Dict[str, List[str]]:
         """
@@ -168,7 +342,7 @@ class BasePrompt:
         :param kwargs: Variables to validate
         :return: Dict with 'missing' and 'extra' keys containing respective variable names
         """
-        required_vars = set(self.get_input_variables())
+        required_vars = set(self.compiled.variables)
         provided_vars = set(kwargs.keys())
         
         return {
@@ -209,6 +383,48 @@ class RolePrompt(BasePrompt):
         
         return {"role": self.role, "content": self.prompt}
 
+    def create_messages(self, rows: Any) -> List[Dict[str, str]]:
+        """
+        Creates one message per row of variables, reusing the compiled template.
+
+        Rendering goes column by column rather than through ``format_prompt``
+        per row, so tens of thousands of messages take milliseconds. Zip the
+        results of several role prompts to build per-row conversations.
+
+        :param rows: A list of variable dicts or a pandas DataFrame (one column per variable)
+        :return: List of message dictionaries, in row order
+        :raises PromptValidationError: If strict mode and a row is missing a required variable
+        """
+        try:
+            compiled = self.compiled
+        except ValueError as e:
+            raise PromptValidationError(f"Error formatting prompt: {e}")
+        names = tuple(f[0] for f in compiled.fields if f is not None)
+        if not (hasattr(rows, "columns") and hasattr(rows, "to_dict")):
+            # Materialize once so the strict check and rendering see the same rows
+            rows = list(rows)
+        if self.strict:
+            self._check_rows(rows, set(compiled.variables))
+        columns, n_rows = _as_columns(rows, names, self.defaults)
+        try:
+            contents = compiled.render_columns(columns, n_rows)
+        except (KeyError, ValueError) as e:
+            raise PromptValidationError(f"Error formatting prompt: {e}")
+        role = self.role
+        return [{"role": role, "content": content} for content in contents]
+
+    def _check_rows(self, rows: Any, required: set) -> None:
+        required = required - self.defaults.keys()
+        if hasattr(rows, "columns"):
+            missing_vars = required - set(rows.columns)
+            if missing_vars:
+                raise PromptValidationError(f"Missing required variables: {missing_vars}")
+            return
+        for i, row in enumerate(rows):
+            missing_vars = required - row.keys()
+            if missing_vars:
+                raise PromptValidationError(f"Missing required variables in row {i}: {missing_vars}")
+
 
 class SystemRolePrompt(RolePrompt):
     def __init__(self, prompt: str, strict: bool = False, defaults: Optional[Dict[str, Any]] = None):
@@ -329,6 +545,30 @@ class MessageAdapter:
             "preamble": preamble if 'preamble' in locals() else None
         }
 
+    @staticmethod
+    def convert_many(
+        conversations: List[List[Dict[str, str]]], provider: str = "openai"
+    ) -> List[Union[List[Dict[str, str]], Dict[str, Any]]]:
+        """
+        Convert a batch of conversations to one provider's format.
+
+        :param conversations: One message list per request
+        :param provider: 'openai', 'anthropic' or 'cohere'
+        :return: Converted conversations, in input order
+        :raises ValueError: If the provider is unknown
+        """
+        converter = _CONVERTERS.get(provider)
+        if converter is None:
+            raise ValueError(f"Unknown provider: {provider}. Must be one of {set(_CONVERTERS)}")
+        return [converter(messages) for messages in conversations]
+
+
+_CONVERTERS: Dict[str, Callable] = {
+    "openai": MessageAdapter.to_openai,
+    "anthropic": MessageAdapter.to_anthropic,
+    "cohere": MessageAdapter.to_cohere,
+}
+
 
 if __name__ == "__main__":
     # Basic usage
@@ -372,3 +612,9 @@ if __name__ == "__main__":
         {"role": "user", "content": "Hello!"}
     ]
     print("Anthropic format:", MessageAdapter.to_anthropic(messages))
+
+    # Batch rendering
+    user = UserRolePrompt("Summarize the feedback from {customer}: {feedback}")
+    rows = [{"customer": "Acme", "feedback": "Great"}, {"customer": "Globex", "feedback": "Slow"}]
+    batch = [[system.create_message(), message] for message in user.create_messages(rows)]
+    print("Batch (anthropic):", MessageAdapter.convert_many(batch, provider="anthropic"))
@@ -1,6 +1,6 @@
 import numpy as np
 from collections import defaultdict
-from typing import List, Tuple, Callable
+from typing import Dict, List, NamedTuple, Optional, Tuple, Callable, Union
 from aimakerspace.openai_utils.embedding import EmbeddingModel
 import asyncio
 
@@ -29,31 +29,153 @@ def normalized_euclidean_distance(vector_a: np.array, vector_b: np.array) -> flo
     return min(distance / max_possible_distance, 1.0)
 
 
+class Metric(NamedTuple):
+    """
+    A batched scoring kernel and the direction its scores rank in.
+
+    ``score(queries, unit_rows, row_norms)`` receives raw query vectors
+    (m, d), the stored rows normalized to unit length (n, d) and their
+    original norms (n,), and returns an (m, n) score matrix in one call.
+    """
+
+    name: str
+    score: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+    higher_is_better: bool
+
+
+def _normalize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns L2-normalized rows and their original norms (zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=-1)
+    safe = np.where(norms == 0, 1.0, norms)
+    return vectors / safe[..., None], norms
+
+
+def _cosine_scores(queries, unit_rows, row_norms):
+    unit_queries, _ = _normalize(queries)
+    return unit_queries @ unit_rows.T
+
+
+def _dot_scores(queries, unit_rows, row_norms):
+    return (queries @ unit_rows.T) * row_norms
+
+
+def _euclidean_scores(queries, unit_rows, row_norms):
+    # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x, without materializing q - x
+    squared = (
+        np.sum(queries * queries, axis=1)[:, None]
+        + (row_norms * row_norms)[None, :]
+        - 2.0 * _dot_scores(queries, unit_rows, row_norms)
+    )
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def _normalized_euclidean_scores(queries, unit_rows, row_norms):
+    return np.minimum(
+        _euclidean_scores(queries, unit_rows, row_norms) / np.sqrt(queries.shape[1]),
+        1.0,
+    )
+
+
+METRICS: Dict[str, Metric] = {}
+
+
+def register_metric(metric: Metric, *aliases: str) -> None:
+    """Makes ``metric`` available to ``search`` under its name and any aliases."""
+    for name in (metric.name, *aliases):
+        METRICS[name] = metric
+
+
+register_metric(Metric("cosine", _cosine_scores, True), "cosine_similarity")
+register_metric(Metric("dot", _dot_scores, True), "inner_product")
+register_metric(Metric("euclidean", _euclidean_scores, False), "l2")
+register_metric(
+    Metric("normalized_euclidean", _normalized_euclidean_scores, False),
+    "normalized_l2",
+)
+
+# The per-pair functions above map onto their batched equivalents
+_CALLABLE_METRICS = {
+    cosine_similarity: "cosine",
+    euclidean_distance: "euclidean",
+    normalized_euclidean_distance: "normalized_euclidean",
+}
+
+
+def resolve_metric(distance_measure: Union[str, Callable, Metric]) -> Optional[Metric]:
+    """
+    Looks up the batched metric for a name, ``Metric`` or known pair function.
+
+    Returns None for an arbitrary callable, which is then scored per pair.
+    """
+    if isinstance(distance_measure, Metric):
+        return distance_measure
+    if isinstance(distance_measure, str):
+        if distance_measure not in METRICS:
+            raise ValueError(
+                f"Unknown metric '{distance_measure}'. Available: {sorted(METRICS)}"
+            )
+        return METRICS[distance_measure]
+    name = _CALLABLE_METRICS.get(distance_measure)
+    return METRICS[name] if name else None
+
+
 class VectorDatabase:
     def __init__(self, embedding_model: EmbeddingModel = None):
         self.vectors = defaultdict(np.array)
         self.embedding_model = embedding_model or EmbeddingModel()
+        self._matrix_cache = None
 
     def insert(self, key: str, vector: np.array) -> None:
         self.vectors[key] = vector
+        self._matrix_cache = None
+
+    def _stacked(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Keys, unit rows and norms of all vectors; rebuilt only after inserts."""
+        if self._matrix_cache is None:
+            keys = list(self.vectors.keys())
+            unit_rows, norms = _normalize(np.array([self.vectors[key] for key in keys]))
+            self._matrix_cache = (keys, unit_rows, norms)
+        return self._matrix_cache
 
     def search(
         self,
         query_vector: np.array,
         k: int,
-        distance_measure: Callable = cosine_similarity,
+        distance_measure: Union[str, Callable, Metric] = cosine_similarity,
     ) -> List[Tuple[str, float]]:
-        scores = [
-            (key, distance_measure(query_vector, vector))
-            for key, vector in self.vectors.items()
-        ]
-        return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+        """
+        Returns the k best (key, score) pairs for ``query_vector``.
+
+        Registered metrics (names in ``METRICS``, a ``Metric`` or the pair
+        functions in this module) are scored against every vector in one
+        NumPy call and ranked in their own direction, so distances come back
+        smallest first. Any other callable is applied per pair, highest first.
+        """
+        if not self.vectors:
+            return []
+        metric = resolve_metric(distance_measure)
+        if metric is None:
+            scores = [
+                (key, distance_measure(query_vector, vector))
+                for key, vector in self.vectors.items()
+            ]
+            return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+
+        keys, unit_rows, norms = self._stacked()
+        scores = metric.score(np.asarray(query_vector, dtype=float)[None, :], unit_rows, norms)[0]
+        ranking = scores if metric.higher_is_better else -scores
+        if k < len(keys):
+            top = np.argpartition(-ranking, k - 1)[:k]
+        else:
+            top = np.arange(len(keys))
+        top = top[np.lexsort((top, -ranking[top]))]
+        return [(keys[i], float(scores[i])) for i in top]
 
     def search_by_text(
         self,
         query_text: str,
         k: int,
-        distance_measure: Callable = cosine_similarity,
+        distance_measure: Union[str, Callable, Metric] = cosine_similarity,
         return_as_text: bool = False,
     ) -> List[Tuple[str, float]]:
         query_vector = self.embedding_model.get_embedding(query_text)
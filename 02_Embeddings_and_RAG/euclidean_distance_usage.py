@@ -7,7 +7,7 @@ functions that were added to vectordatabase.py in your RAG pipeline.
 
 # Import the new distance functions
 from aimakerspace.vectordatabase import euclidean_distance, normalized_euclidean_distance
-from aimakerspace.vectordatabase import cosine_similarity
+from aimakerspace.vectordatabase import cosine_similarity, METRICS
 
 def compare_distance_metrics(query: str, vector_db, k: int = 3):
     """
@@ -21,18 +21,23 @@ def compare_distance_metrics(query: str, vector_db, k: int = 3):
     Returns:
         Dictionary with results for each metric
     """
+    # Registry names: each metric is scored in one batched call and ranked in
+    # its own direction (similarities highest first, distances lowest first)
     metrics = {
-        "Cosine Similarity": cosine_similarity,
-        "Euclidean Distance": euclidean_distance,
-        "Normalized Euclidean": normalized_euclidean_distance
+        "Cosine Similarity": "cosine",
+        "Euclidean Distance": "euclidean",
+        "Normalized Euclidean": "normalized_euclidean"
     }
     
     results = {}
     
-    for metric_name, metric_func in metrics.items():
+    # Embed the query once and reuse it for every metric
+    query_vector = vector_db.embedding_model.get_embedding(query)
+    
+    for metric_name, metric in metrics.items():
         try:
-            results[metric_name] = vector_db.search_by_text(
-                query, k=k, distance_measure=metric_func
+            results[metric_name] = vector_db.search(
+                query_vector, k=k, distance_measure=metric
             )
         except Exception as e:
             results[metric_name] = f"Error: {str(e)}"
@@ -53,22 +58,15 @@ def enhanced_rag_pipeline_with_metrics(vector_db, chat_openai, rag_system_prompt
             self.include_scores = include_scores
             self.distance_metric = distance_metric
             
-            # Map metric names to functions
-            self.metric_functions = {
-                "cosine": cosine_similarity,
-                "euclidean": euclidean_distance,
-                "normalized_euclidean": normalized_euclidean_distance
-            }
+            # Batched metric from the registry; it also knows its ranking direction
+            self.metric = METRICS.get(distance_metric, METRICS["cosine"])
 
         def run_pipeline(self, user_query: str, k: int = 4, **system_kwargs) -> dict:
-            # Get the appropriate distance metric
-            distance_func = self.metric_functions.get(self.distance_metric, cosine_similarity)
-            
             # Retrieve relevant contexts using selected metric
             context_list = self.vector_db_retriever.search_by_text(
                 user_query, 
                 k=k, 
-                distance_measure=distance_func
+                distance_measure=self.metric
             )
             
             context_prompt = ""
@@ -0,0 +1,93 @@
+"""
+Render benchmark for the compiled prompt templates in aimakerspace.openai_utils.prompts.
+
+Compares BasePrompt and ConditionalPrompt against the previous per-call
+approach (re-scan the template with a regex, then str.format or one
+str.replace per variable) on large templates with many variables.
+
+Run from this directory:
+
+    python prompt_render_benchmark.py
+"""
+import re
+import timeit
+
+from aimakerspace.openai_utils.prompts import BasePrompt, ConditionalPrompt
+
+_PATTERN = re.compile(r"\{([^}]+)\}")
+_VAR_PATTERN = re.compile(r"\{([^{}]+)\}")
+_CONDITIONAL_PATTERN = re.compile(
+    r"\{if\s+([^}]+)\}(.*?)(?:\{else\}(.*?))?\{/if\}", re.DOTALL
+)
+
+
+def legacy_base_format(template: str, **kwargs) -> str:
+    """BasePrompt.format_prompt as it was: find the variables on every call."""
+    variables = _PATTERN.findall(template)
+    return template.format(**{var: kwargs.get(var, "") for var in variables})
+
+
+def legacy_conditional_format(template: str, **kwargs) -> str:
+    """ConditionalPrompt.format_prompt as it was: regex sub, then one replace per variable."""
+
+    def replace_conditional(match):
+        condition = match.group(1).strip()
+        false_content = match.group(3).strip() if match.group(3) else ""
+        return match.group(2).strip() if kwargs.get(condition) else false_content
+
+    result = _CONDITIONAL_PATTERN.sub(replace_conditional, template)
+    for var in _VAR_PATTERN.findall(result):
+        result = result.replace(f"{{{var}}}", str(kwargs.get(var, "")))
+    return result
+
+
+def build_templates(n_variables: int):
+    base = "".join(
+        f"## Field {i}\nThe value recorded for field {i} is {{field_{i}}}.\n"
+        for i in range(n_variables)
+    )
+    conditional = "".join(
+        f"{{if flag_{i}}}Field {i} is set to {{field_{i}}}.{{else}}Field {i} is empty.{{/if}}\n"
+        for i in range(n_variables)
+    )
+    values = {f"field_{i}": f"value number {i}" for i in range(n_variables)}
+    values.update({f"flag_{i}": i % 2 == 0 for i in range(n_variables)})
+    return base, conditional, values
+
+
+def time_per_call(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'template':<24}{'vars':>6}{'legacy us':>12}{'compiled us':>13}{'speedup':>9}")
+    for n_variables in (10, 100, 1000):
+        base, conditional, values = build_templates(n_variables)
+        number = max(10, 20_000 // n_variables)
+
+        base_prompt = BasePrompt(base)
+        conditional_prompt = ConditionalPrompt(conditional)
+        assert base_prompt.format_prompt(**values) == legacy_base_format(base, **values)
+        assert conditional_prompt.format_prompt(**values) == legacy_conditional_format(
+            conditional, **values
+        )
+
+        rows = [
+            (
+                "BasePrompt",
+                lambda: legacy_base_format(base, **values),
+                lambda: base_prompt.format_prompt(**values),
+            ),
+            (
+                "ConditionalPrompt",
+                lambda: legacy_conditional_format(conditional, **values),
+                lambda: conditional_prompt.format_prompt(**values),
+            ),
+        ]
+        for name, legacy, compiled in rows:
+            legacy_us = time_per_call(legacy, number)
+            compiled_us = time_per_call(compiled, number)
+            print(
+                f"{name:<24}{n_variables:>6}{legacy_us:>12.1f}{compiled_us:>13.1f}"
+                f"{legacy_us / compiled_us:>8.1f}x"
+            )
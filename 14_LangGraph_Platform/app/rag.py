@@ -26,9 +26,15 @@ from langgraph.graph import START, StateGraph
 from typing_extensions import TypedDict
 
 
+@lru_cache(maxsize=1)
+def _encoding() -> tiktoken.Encoding:
+    """Return the gpt-4o tokenizer, resolved once instead of per length call."""
+    return tiktoken.encoding_for_model("gpt-4o")
+
+
 def _tiktoken_len(text: str) -> int:
     """Return token length using tiktoken; used for chunk length measurement."""
-    tokens = tiktoken.encoding_for_model("gpt-4o").encode(text)
+    tokens = _encoding().encode(text)
     return len(tokens)
 
 
@@ -48,7 +48,10 @@ app.add_middleware(
 )
 
 # Initialize components with error handling
-vector_store = AdvancedVectorStore()
+# Surveys persist across restarts; set VECTOR_STORE_DIR to change where
+vector_store = AdvancedVectorStore(
+    persist_dir=os.getenv("VECTOR_STORE_DIR", "data/vector_store")
+)
 rag_generator = RAGGenerator()
 
 # Initialize advanced retrieval if available
@@ -142,6 +145,8 @@ async def ingest_surveys_with_intelligent_agents(file: UploadFile = File(...)):
         
         flagged_results = []
         processed_count = 0
+        survey_texts = []
+        survey_metadatas = []
         
         print(f"📥 Processing {len(df_enriched)} survey responses...")
         
@@ -156,11 +161,9 @@ async def ingest_surveys_with_intelligent_agents(file: UploadFile = File(...)):
                 **ai_analysis
             }
             
-            # Store in advanced vector database
-            vector_store.add_survey(
-                text=row['response_text'],
-                metadata=metadata
-            )
+            # Collected here, stored in one bulk insert after the loop
+            survey_texts.append(row['response_text'])
+            survey_metadatas.append(metadata)
             
             # Intelligent flagging (if available)
             if langgraph_flagger:
@@ -211,6 +214,9 @@ async def ingest_surveys_with_intelligent_agents(file: UploadFile = File(...)):
             
             processed_count += 1
         
+        # Store in advanced vector database: bulk chunking and batched embedding
+        vector_store.add_surveys(survey_texts, survey_metadatas)
+        
         agent_status = "langgraph_enhanced" if langgraph_flagger else "simple_fallback"
         
         return {
@@ -260,16 +266,18 @@ async def get_intelligent_flags(
 @app.get("/search")
 async def search_similar(
     query: str = Query(..., min_length=1),
-    k: int = Query(5, ge=1, le=20)
+    k: int = Query(5, ge=1, le=20),
+    mode: str = Query("dense", pattern="^(dense|keyword|hybrid)$", description="dense, keyword (BM25) or hybrid (both, rank-fused)")
 ):
     """Advanced semantic search with enhanced vector store"""
-    results = vector_store.search_similar(query, k)
+    results = vector_store.search_similar(query, k, mode=mode)
     return results
 
 @app.get("/analyze")
 async def analyze_with_rag(
     query: str = Query(..., min_length=1, description="Analysis question about survey data"),
-    use_advanced: bool = Query(False, description="Use advanced retrieval with cross-encoder and web search")
+    use_advanced: bool = Query(False, description="Use advanced retrieval with cross-encoder and web search"),
+    mode: str = Query("dense", pattern="^(dense|keyword|hybrid)$", description="Basic retrieval mode: dense, keyword (BM25) or hybrid")
 ):
     """RAG-powered analysis of survey data with optional advanced retrieval"""
     try:
@@ -297,7 +305,7 @@ async def analyze_with_rag(
             }
         else:
             # Use basic retrieval
-            context_docs = vector_store.get_context_for_query(query)
+            context_docs = vector_store.get_context_for_query(query, mode=mode)
             
             # Generate analysis with basic RAG
             analysis = rag_generator.generate_response(query, context_docs)
@@ -312,7 +320,8 @@ async def analyze_with_rag(
                     for doc in context_docs
                 ],
                 "rag_enhanced": True,
-                "retrieval_method": "basic"
+                "retrieval_method": "basic",
+                "retrieval_mode": mode
             }
         
     except Exception as e:
@@ -323,7 +332,7 @@ async def analyze_with_basic_rag(
     query: str = Query(..., min_length=1, description="Analysis question about survey data")
 ):
     """Basic RAG analysis (for comparison with advanced)"""
-    return await analyze_with_rag(query=query, use_advanced=False)
+    return await analyze_with_rag(query=query, use_advanced=False, mode="dense")
 
 @app.get("/analyze-advanced")
 async def analyze_with_advanced_rag(
@@ -336,7 +345,7 @@ async def analyze_with_advanced_rag(
             "message": "Install required packages: pip install transformers torch"
         }, 503
     
-    return await analyze_with_rag(query=query, use_advanced=True)
+    return await analyze_with_rag(query=query, use_advanced=True, mode="dense")
 
 @app.get("/compare-retrieval")
 async def compare_retrieval_methods(
@@ -457,7 +466,7 @@ async def get_enhanced_stats():
         "total_vectors": vector_store.count(),
         "total_flags": recent_flags_count,
         "embedding_model": "text-embedding-3-small",
-        "vector_database": "In-Memory Enhanced",
+        "vector_database": "SQLite + Memory-Mapped" if vector_store.persist_dir else "In-Memory Enhanced",
         "flagging_system": "Intelligent Agent-based" if langgraph_flagger else "Simple Rule-based",
         "retrieval_system": "Advanced (Cross-encoder + Web)" if ADVANCED_RETRIEVAL_AVAILABLE else "Basic",
         "langgraph_available": langgraph_flagger is not None,
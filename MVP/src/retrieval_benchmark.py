@@ -0,0 +1,193 @@
+"""
+Offline recall and latency benchmark for the AdvancedVectorStore search modes.
+
+Builds a synthetic survey corpus in which relevance depends on both meaning
+and exact terms: every response is about one topic and names one product
+code. A query asks about a topic and a code, and the relevant responses are
+those matching both. Half the queries reuse the responses' own topic words
+("exact"); the other half paraphrase the topic with words no response uses
+("paraphrase"), so BM25 only matches their code. The fake embedding model
+maps all of a topic's words close together but blurs product codes, as real
+embedding models tend to with rare identifiers. Recall is reported per query
+type and overall. Queries pay a simulated embedding round trip.
+
+Run from the MVP directory:
+
+    python src/retrieval_benchmark.py --docs 20000 --queries 200 --output retrieval_bench.json
+"""
+import numpy as np
+from collections import Counter
+from typing import Dict, List
+from vector_store import AdvancedVectorStore, SEARCH_MODES
+import json
+import time
+import zlib
+
+
+class TopicEmbeddings:
+    """Deterministic embeddings: mean of word vectors, topic words share a centre"""
+
+    def __init__(
+        self, topic_words: List[List[str]], dim: int = 256, latency_ms: float = 0.0, seed: int = 0
+    ):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        rng = np.random.default_rng(seed)
+        self._words = {}
+        for words in topic_words:
+            center = rng.standard_normal(dim)
+            for word in words:
+                self._words[word] = center + 0.5 * rng.standard_normal(dim)
+
+    def _word(self, word: str) -> np.ndarray:
+        vector = self._words.get(word)
+        if vector is None:
+            # Words outside the topic vocabulary (product codes, filler) carry less signal
+            vector = 0.6 * np.random.default_rng(zlib.crc32(word.encode())).standard_normal(self.dim)
+        return vector
+
+    def _embed(self, text: str) -> List[float]:
+        return np.mean([self._word(word) for word in text.lower().split()], axis=0).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._embed(text)
+
+
+# Responses describe a topic with its first words; paraphrase queries use the rest
+_RESPONSE_WORDS = 8
+_TOPIC_WORDS = 12
+
+QUERY_TYPES = ("exact", "paraphrase")
+
+
+def build_corpus(n_docs: int, n_topics: int, n_codes: int, seed: int = 0):
+    """Synthetic responses with their (topic, code) labels and the topic vocabulary"""
+    rng = np.random.default_rng(seed)
+    topic_words = [[f"topic{t}term{w}" for w in range(_TOPIC_WORDS)] for t in range(n_topics)]
+    filler = ["the", "our", "team", "really", "since", "last", "month", "and", "it", "is"]
+
+    texts, labels = [], []
+    for _ in range(n_docs):
+        topic, code = int(rng.integers(n_topics)), int(rng.integers(n_codes))
+        words = list(rng.choice(topic_words[topic][:_RESPONSE_WORDS], 4, replace=False))
+        words += list(rng.choice(filler, 4)) + [f"sku{code}"]
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+        labels.append((topic, code))
+    return texts, labels, topic_words
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def run_benchmark(
+    n_docs: int = 20000,
+    n_queries: int = 200,
+    k: int = 10,
+    n_topics: int = 50,
+    n_codes: int = 500,
+    latency_ms: float = 50.0,
+    seed: int = 0,
+) -> dict:
+    """
+    Ingests the synthetic corpus and measures every search mode.
+
+    :return: JSON-serializable dict with the settings and, per mode, recall@k and latency percentiles
+    """
+    texts, labels, topic_words = build_corpus(n_docs, n_topics, n_codes, seed)
+    store = AdvancedVectorStore()
+    store.embedding_model = TopicEmbeddings(topic_words, seed=seed)
+    start = time.perf_counter()
+    store.add_surveys(texts, [{"label": label} for label in labels])
+    ingest_s = time.perf_counter() - start
+    store.embedding_model.latency_ms = latency_ms
+
+    # Queries are built from labels that occur in the corpus
+    label_counts = Counter(labels)
+    rng = np.random.default_rng(seed + 1)
+    queries = []
+    for n, i in enumerate(rng.choice(n_docs, n_queries, replace=False)):
+        topic, code = labels[i]
+        query_type = QUERY_TYPES[n % 2]
+        if query_type == "exact":
+            vocabulary = topic_words[topic][:_RESPONSE_WORDS]
+        else:
+            vocabulary = topic_words[topic][_RESPONSE_WORDS:]
+        words = list(rng.choice(vocabulary, 3, replace=False)) + [f"sku{code}"]
+        queries.append((query_type, " ".join(words), labels[i]))
+
+    results = {}
+    for mode in SEARCH_MODES:
+        latencies = []
+        recalls = {query_type: [] for query_type in QUERY_TYPES}
+        for query_type, query, label in queries:
+            start = time.perf_counter()
+            hits = store.search_similar(query, k, mode=mode)
+            latencies.append(time.perf_counter() - start)
+            relevant = sum(metadata["label"] == label for metadata in hits["metadatas"])
+            recalls[query_type].append(relevant / min(label_counts[label], k))
+        results[mode] = {
+            f"recall_at_{k}": float(np.mean(sum(recalls.values(), []))),
+            **{
+                f"{query_type}_recall_at_{k}": float(np.mean(values))
+                for query_type, values in recalls.items()
+            },
+            **_percentiles(latencies),
+        }
+
+    return {
+        "settings": {
+            "docs": n_docs,
+            "queries": n_queries,
+            "k": k,
+            "topics": n_topics,
+            "codes": n_codes,
+            "embed_latency_ms": latency_ms,
+            "seed": seed,
+        },
+        "ingest_s": ingest_s,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    import io
+
+    parser = argparse.ArgumentParser(description="Benchmark dense, keyword and hybrid search")
+    parser.add_argument("--docs", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated query embedding round trip")
+    parser.add_argument("--output", default=None, help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    # The store logs every call; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = run_benchmark(
+            n_docs=args.docs, n_queries=args.queries, k=args.k, latency_ms=args.latency_ms
+        )
+
+    print(f"ingest: {report['ingest_s']:.1f}s for {args.docs} documents")
+    print(
+        f"{'mode':<10}{'recall@' + str(args.k):>11}{'exact':>8}{'paraphrase':>12}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    for mode, record in report["results"].items():
+        print(
+            f"{mode:<10}{record[f'recall_at_{args.k}']:>11.3f}"
+            f"{record[f'exact_recall_at_{args.k}']:>8.3f}"
+            f"{record[f'paraphrase_recall_at_{args.k}']:>12.3f}"
+            f"{record['p50_ms']:>9.1f}{record['p95_ms']:>9.1f}{record['p99_ms']:>9.1f}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
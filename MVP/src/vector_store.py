@@ -2,15 +2,71 @@ import tiktoken
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain.schema import Document
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from array import array
+from collections import Counter
+import numpy as np
 import os
 import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _gpt4_encoding():
+    """Tokenizer used for chunk lengths, resolved once per process"""
+    return tiktoken.encoding_for_model("gpt-4")
+
+
+_TOKEN = re.compile(r"\w+")
+
+SEARCH_MODES = ("dense", "keyword", "hybrid")
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased word tokens for the BM25 index"""
+    return _TOKEN.findall(text.lower())
+
+
+def _top_k(scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """Candidate rows with the k highest scores, best first, ties broken by row order"""
+    k = min(k, len(candidates))
+    if k <= 0:
+        return candidates[:0]
+    values = scores[candidates]
+    # The k-th best score; rows tied with it at the cut are taken lowest first
+    threshold = np.partition(values, len(values) - k)[len(values) - k]
+    above = candidates[values > threshold]
+    tied = np.sort(candidates[values == threshold])[:k - len(above)]
+    top = np.concatenate([above, tied])
+    return top[np.lexsort((top, -scores[top]))]
+
+
+def _json_default(value):
+    """JSON fallback for metadata values coming from pandas rows"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
 
 # Simple in-memory vector store that actually works
 class AdvancedVectorStore:
-    """Advanced vector store with in-memory storage and embeddings"""
+    """
+    Advanced vector store with in-memory storage and embeddings.
+    
+    With persist_dir set, documents and metadata are also written to a SQLite
+    database and embeddings to a memory-mapped float32 file in that directory,
+    and everything already there is loaded on construction.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        bm25_k1: float = 1.5,
+        bm25_b: float = 0.75,
+        rrf_k: int = 60
+    ):
         print("🔧 Initializing AdvancedVectorStore...")
         
         # Better embedding model
@@ -31,64 +87,336 @@ class AdvancedVectorStore:
             length_function=self.tiktoken_len,
         )
         
-        # Simple in-memory storage
+        # Simple in-memory storage: one unit-length embedding row per document,
+        # in a matrix that grows by doubling so appends stay amortized O(1)
         self.documents = []
-        self.embeddings_cache = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._pending: List[int] = []
         
-        print("✅ Vector store initialized with in-memory storage")
+        # BM25 inverted index, maintained as documents are added:
+        # term -> (document rows, term frequencies), plus every document's length
+        self.bm25_k1 = bm25_k1
+        self.bm25_b = bm25_b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_lengths = array("I")
+        self._total_length = 0
+        
+        # Reciprocal-rank fusion constant for hybrid search
+        self.rrf_k = rrf_k
+        
+        self.persist_dir = persist_dir
+        self._db: Optional[sqlite3.Connection] = None
+        if persist_dir:
+            self._open_persistent(persist_dir)
+            print(f"✅ Vector store loaded {len(self.documents)} documents from {persist_dir}")
+        else:
+            print("✅ Vector store initialized with in-memory storage")
     
     def tiktoken_len(self, text: str) -> int:
         """Count actual tokens using tiktoken"""
         try:
-            tokens = tiktoken.encoding_for_model("gpt-4").encode(text)
+            tokens = _gpt4_encoding().encode(text)
             return len(tokens)
         except:
             return len(text.split())
     
-    def add_survey(self, text: str, metadata: dict):
-        """Add survey response with smart chunking"""
-        try:
-            print(f"📝 Adding survey: {text[:50]}...")
-            
-            # For survey responses, usually don't need chunking as they're short
-            # But we'll do minimal chunking for consistency
-            chunks = self.text_splitter.split_text(text) if len(text) > 800 else [text]
-            
-            for i, chunk in enumerate(chunks):
-                # Create document with metadata
-                doc_metadata = {
+    def _open_persistent(self, persist_dir: str) -> None:
+        """Open (or create) the on-disk store and load what is already in it"""
+        os.makedirs(persist_dir, exist_ok=True)
+        self._vectors_path = os.path.join(persist_dir, "embeddings.f32")
+        self._db = sqlite3.connect(
+            os.path.join(persist_dir, "documents.db"), check_same_thread=False
+        )
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                row INTEGER PRIMARY KEY,
+                page_content TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                embedded INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        
+        cursor = self._db.execute(
+            "SELECT row, page_content, metadata, embedded FROM documents ORDER BY row"
+        )
+        for row, page_content, metadata, embedded in cursor:
+            self.documents.append(
+                Document(page_content=page_content, metadata=json.loads(metadata))
+            )
+            if not embedded:
+                self._pending.append(row)
+        self._index_documents(0, self.documents)
+        
+        # Vectors stay on disk; only the pages that searches touch are read in
+        dim = self._db.execute("SELECT value FROM settings WHERE key = 'dim'").fetchone()
+        if dim is not None and os.path.exists(self._vectors_path):
+            dim = int(dim[0])
+            capacity = os.path.getsize(self._vectors_path) // (4 * dim)
+            if capacity:
+                self._matrix = self._map_vectors(capacity, dim)
+    
+    def _map_vectors(self, capacity: int, dim: int) -> np.memmap:
+        """Memory-map the vector file, extending it to hold capacity rows"""
+        size = capacity * dim * 4
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+    
+    def close(self) -> None:
+        """Flush embeddings and close the on-disk store"""
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Unit-normalized embedding matrix, one row per document"""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:len(self.documents)]
+    
+    def _store_embeddings(self, rows: np.ndarray, vectors, needed: Optional[int] = None) -> None:
+        """
+        Write normalized vectors into the matrix at the given document rows.
+        
+        needed is the row count the matrix must hold (the document count by
+        default); rows past the document count stay invisible to searches.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        
+        needed = len(self.documents) if needed is None else needed
+        if self._matrix is None or needed > len(self._matrix):
+            current = 0 if self._matrix is None else len(self._matrix)
+            capacity = max(needed, 2 * current)
+            if self._db is not None:
+                # Growing the file keeps existing rows in place, nothing is rewritten
+                if self._matrix is not None:
+                    self._matrix.flush()
+                self._matrix = self._map_vectors(capacity, vectors.shape[1])
+            else:
+                grown = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+                if self._matrix is not None:
+                    grown[:current] = self._matrix
+                self._matrix = grown
+        
+        self._matrix[rows] = vectors
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+    
+    def _save_dim(self) -> None:
+        """Record the vector file's dimension, in the caller's transaction"""
+        if self._matrix is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO settings VALUES ('dim', ?)", (str(self._matrix.shape[1]),)
+            )
+    
+    def _append(self, documents: List[Document], embedded: List[int], vectors) -> None:
+        """
+        Append documents in one step, all or nothing.
+        
+        embedded indexes into documents and pairs with vectors; the other
+        documents are embedded at search time. Everything that can fail runs
+        before the in-memory documents and index change, so on an error the
+        store is left as it was.
+        """
+        start = len(self.documents)
+        done = set(embedded)
+        term_counts = [Counter(_tokenize(doc.page_content)) for doc in documents]
+        if embedded:
+            self._store_embeddings(
+                start + np.asarray(embedded), vectors, start + len(documents)
+            )
+        
+        if self._db is not None:
+            rows = [
+                (
+                    start + i,
+                    doc.page_content,
+                    json.dumps(doc.metadata, default=_json_default),
+                    int(i in done)
+                )
+                for i, doc in enumerate(documents)
+            ]
+            # Vectors are flushed first, so a committed row always has its embedding;
+            # the connection context manager rolls the transaction back on error
+            with self._db:
+                self._save_dim()
+                self._db.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", rows)
+        
+        self.documents.extend(documents)
+        self._pending.extend(start + i for i in range(len(documents)) if i not in done)
+        self._index_counts(start, term_counts)
+    
+    def _embed_pending(self) -> None:
+        """Embed documents whose ingest-time embedding failed; raises on failure"""
+        if not self._pending:
+            return
+        rows = self._pending
+        vectors = self.embedding_model.embed_documents(
+            [self.documents[row].page_content for row in rows]
+        )
+        self._store_embeddings(np.asarray(rows), vectors)
+        if self._db is not None:
+            with self._db:
+                self._save_dim()
+                self._db.executemany(
+                    "UPDATE documents SET embedded = 1 WHERE row = ?", [(row,) for row in rows]
+                )
+        self._pending = []
+    
+    def _index_documents(self, start: int, documents: List[Document]) -> None:
+        """Add documents (stored from row start on) to the BM25 inverted index"""
+        self._index_counts(start, [Counter(_tokenize(doc.page_content)) for doc in documents])
+    
+    def _index_counts(self, start: int, term_counts: List[Counter]) -> None:
+        """Add per-document term counts (from row start on) to the inverted index"""
+        for offset, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = (array("I"), array("I"))
+                posting[0].append(start + offset)
+                posting[1].append(tf)
+            length = sum(counts.values())
+            self._doc_lengths.append(length)
+            self._total_length += length
+    
+    def _chunk_documents(self, text: str, metadata: dict) -> List[Document]:
+        """Split one survey response into Documents carrying its metadata"""
+        # For survey responses, usually don't need chunking as they're short
+        # But we'll do minimal chunking for consistency
+        chunks = self.text_splitter.split_text(text) if len(text) > 800 else [text]
+        source_text = text[:100] + "..." if len(text) > 100 else text
+        
+        return [
+            Document(
+                page_content=chunk,
+                metadata={
                     **metadata,
                     "chunk_id": i,
                     "total_chunks": len(chunks),
-                    "source_text": text[:100] + "..." if len(text) > 100 else text
+                    "source_text": source_text
                 }
-                
-                document = Document(
-                    page_content=chunk,
-                    metadata=doc_metadata
-                )
-                
-                self.documents.append(document)
-            
-            print(f"✅ Added {len(chunks)} document chunks. Total documents: {len(self.documents)}")
+            )
+            for i, chunk in enumerate(chunks)
+        ]
+    
+    def add_survey(self, text: str, metadata: dict):
+        """Add survey response with smart chunking"""
+        print(f"📝 Adding survey: {text[:50]}...")
+        try:
+            chunks = self._chunk_documents(text, metadata)
             
+            # Embed all chunks in one batched request so searches never pay for it
+            embedded, vectors, _ = self._embed_batches(
+                [chunk.page_content for chunk in chunks], len(chunks), 1
+            )
         except Exception as e:
-            print(f"❌ Error adding survey: {e}")
+            print(f"❌ Error processing survey: {e}")
             # Still add the document even if processing fails
-            doc = Document(page_content=text, metadata=metadata)
-            self.documents.append(doc)
+            chunks, embedded, vectors = [Document(page_content=text, metadata=metadata)], [], None
+        
+        # All or nothing: a storage error leaves the store unchanged and is raised
+        self._append(chunks, embedded, vectors)
+        print(f"✅ Added {len(chunks)} document chunks. Total documents: {len(self.documents)}")
+    
+    def _embed_batches(self, texts: List[str], batch_size: int, max_workers: int):
+        """
+        Embed texts in concurrent batched requests.
+        
+        Returns the indices (into texts) that were embedded with their vectors,
+        and the indices whose batch failed.
+        """
+        if self.embedding_model is None or not texts:
+            return [], [], list(range(len(texts)))
+        
+        offsets = list(range(0, len(texts), batch_size))
+        embedded, vectors, failed = [], [], []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                offset: pool.submit(
+                    self.embedding_model.embed_documents, texts[offset:offset + batch_size]
+                )
+                for offset in offsets
+            }
+            for offset, future in futures.items():
+                batch = range(offset, min(offset + batch_size, len(texts)))
+                try:
+                    vectors.extend(future.result())
+                    embedded.extend(batch)
+                except Exception as e:
+                    print(f"⚠️ Embedding batch at {offset} failed: {e}, will retry at search time")
+                    failed.extend(batch)
+        
+        return embedded, vectors, failed
+    
+    def add_surveys(
+        self,
+        texts: List[str],
+        metadatas: List[dict],
+        batch_size: int = 256,
+        max_workers: int = 8
+    ) -> int:
+        """
+        Add many survey responses at once.
+        
+        Chunks every response, embeds the chunks in concurrent batches of
+        batch_size, then appends documents and embeddings in one step.
+        Returns the number of document chunks added.
+        """
+        if len(texts) != len(metadatas):
+            raise ValueError("texts and metadatas must have the same length")
+        
+        print(f"📝 Adding {len(texts)} surveys...")
+        
+        documents = []
+        for text, metadata in zip(texts, metadatas):
+            try:
+                documents.extend(self._chunk_documents(text, metadata))
+            except Exception as e:
+                print(f"❌ Error chunking survey: {e}")
+                # Still add the document even if processing fails
+                documents.append(Document(page_content=text, metadata=metadata))
+        
+        embedded, vectors, _ = self._embed_batches(
+            [doc.page_content for doc in documents], batch_size, max_workers
+        )
+        self._append(documents, embedded, vectors)
+        
+        print(f"✅ Added {len(documents)} document chunks. Total documents: {len(self.documents)}")
+        return len(documents)
     
-    def search_similar(self, query: str, k: int = 5) -> Dict:
-        """Enhanced similarity search using embeddings or keyword matching"""
+    def search_similar(self, query: str, k: int = 5, mode: str = "dense") -> Dict:
+        """
+        Enhanced similarity search.
+        
+        mode is "dense" (embeddings, falling back to keyword matching),
+        "keyword" (BM25) or "hybrid" (both, fused by reciprocal rank).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {SEARCH_MODES}, got {mode!r}")
+        
         try:
-            print(f"🔍 Searching for: '{query}' in {len(self.documents)} documents")
+            print(f"🔍 Searching for: '{query}' in {len(self.documents)} documents ({mode})")
             
             if not self.documents:
                 print("⚠️ No documents to search")
                 return {"query": query, "documents": [], "metadatas": [], "scores": []}
             
+            if mode == "hybrid":
+                return self._hybrid_search(query, k)
+            
             # Try embedding-based search first
-            if self.embedding_model:
+            if mode == "dense" and self.embedding_model:
                 try:
                     return self._embedding_search(query, k)
                 except Exception as e:
@@ -101,80 +429,98 @@ class AdvancedVectorStore:
             print(f"❌ Search error: {e}")
             return {"query": query, "documents": [], "metadatas": [], "scores": []}
     
-    def _embedding_search(self, query: str, k: int) -> Dict:
-        """Embedding-based similarity search"""
-        # Get query embedding
-        query_embedding = self.embedding_model.embed_query(query)
-        
-        # Calculate similarities
-        similarities = []
-        for i, doc in enumerate(self.documents):
-            # Get or calculate document embedding
-            doc_text = doc.page_content
-            if doc_text not in self.embeddings_cache:
-                doc_embedding = self.embedding_model.embed_query(doc_text)
-                self.embeddings_cache[doc_text] = doc_embedding
-            else:
-                doc_embedding = self.embeddings_cache[doc_text]
-            
-            # Calculate cosine similarity
-            similarity = self._cosine_similarity(query_embedding, doc_embedding)
-            similarities.append((doc, similarity, i))
-        
-        # Sort by similarity and take top k
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        top_results = similarities[:k]
-        
+    def _results(self, query: str, rows, scores) -> Dict:
         return {
             "query": query,
-            "documents": [doc.page_content for doc, _, _ in top_results],
-            "metadatas": [doc.metadata for doc, _, _ in top_results],
-            "scores": [float(score) for _, score, _ in top_results]
+            "documents": [self.documents[i].page_content for i in rows],
+            "metadatas": [self.documents[i].metadata for i in rows],
+            "scores": [float(score) for score in scores]
         }
     
-    def _keyword_search(self, query: str, k: int) -> Dict:
-        """Simple keyword-based search"""
-        query_words = set(query.lower().split())
-        matches = []
+    def _dense_ranking(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k rows by cosine similarity, with their scores"""
+        self._embed_pending()
         
-        for doc in self.documents:
-            doc_words = set(doc.page_content.lower().split())
-            # Calculate overlap score
-            overlap = len(query_words.intersection(doc_words))
-            if overlap > 0:
-                score = overlap / len(query_words)
-                matches.append((doc, score))
+        # Get query embedding
+        query_embedding = np.asarray(self.embedding_model.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(query_embedding)
+        if norm > 0:
+            query_embedding /= norm
         
-        # Sort by score and take top k
-        matches.sort(key=lambda x: x[1], reverse=True)
-        top_matches = matches[:k]
+        # Cosine similarity against every document in one matrix product
+        similarities = self.embeddings @ query_embedding
         
-        print(f"🔍 Keyword search found {len(matches)} matches, returning top {len(top_matches)}")
+        # Partial sort: only the top k are ordered
+        top = _top_k(similarities, np.arange(len(similarities)), k)
+        return top, similarities[top]
+    
+    def _keyword_ranking(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Top k rows by BM25 over the inverted index, their scores and the match count"""
+        n = len(self._doc_lengths)
+        postings = [self._postings[term] for term in set(_tokenize(query)) if term in self._postings]
+        if not postings:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32), 0
         
-        return {
-            "query": query,
-            "documents": [doc.page_content for doc, _ in top_matches],
-            "metadatas": [doc.metadata for doc, _ in top_matches],
-            "scores": [score for _, score in top_matches]
-        }
+        # Only rows in the query terms' posting lists are touched, so a query
+        # costs the total posting length rather than the corpus size
+        k1, b = self.bm25_k1, self.bm25_b
+        avg_length = self._total_length / n
+        all_rows, contributions = [], []
+        for rows, tfs in postings:
+            rows = np.frombuffer(rows, dtype=np.uintc).astype(np.intp)
+            tf = np.frombuffer(tfs, dtype=np.uintc).astype(np.float32)
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uintc)[rows].astype(np.float32)
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            contributions.append(
+                idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / avg_length))
+            )
+            all_rows.append(rows)
+        
+        # Sum per row over the union of the posting lists (matches come back sorted)
+        matches, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        top = _top_k(scores, np.arange(len(matches)), k)
+        return matches[top], scores[top], len(matches)
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        import math
+    def _embedding_search(self, query: str, k: int) -> Dict:
+        """Embedding-based similarity search"""
+        return self._results(query, *self._dense_ranking(query, k))
+    
+    def _keyword_search(self, query: str, k: int) -> Dict:
+        """BM25 keyword search over the inverted index"""
+        top, scores, n_matches = self._keyword_ranking(query, k)
+        print(f"🔍 Keyword search found {n_matches} matches, returning top {len(top)}")
+        return self._results(query, top, scores)
+    
+    def _hybrid_search(self, query: str, k: int) -> Dict:
+        """Dense and BM25 retrieval run concurrently, fused by reciprocal rank"""
+        # Each retriever contributes a deeper list than k so fusion can reorder
+        depth = max(4 * k, 20)
         
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = math.sqrt(sum(a * a for a in vec1))
-        magnitude2 = math.sqrt(sum(a * a for a in vec2))
+        # The query embedding is a network call; BM25 runs while it is in flight
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            dense = pool.submit(self._dense_ranking, query, depth) if self.embedding_model else None
+            keyword_rows, _, _ = self._keyword_ranking(query, depth)
+            dense_rows = []
+            if dense is not None:
+                try:
+                    dense_rows = dense.result()[0]
+                except Exception as e:
+                    print(f"⚠️ Embedding search failed: {e}, using keyword ranking only")
         
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0
+        fused = {}
+        for ranking in (dense_rows, keyword_rows):
+            for rank, row in enumerate(ranking):
+                fused[row] = fused.get(row, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        top = sorted(fused, key=fused.get, reverse=True)[:k]
         
-        return dot_product / (magnitude1 * magnitude2)
+        print(f"🔀 Hybrid search fused {len(dense_rows)} dense and {len(keyword_rows)} keyword results")
+        return self._results(query, top, [fused[row] for row in top])
     
-    def get_context_for_query(self, query: str) -> List[Document]:
+    def get_context_for_query(self, query: str, mode: str = "dense") -> List[Document]:
         """Get relevant context documents for RAG"""
         try:
-            search_results = self.search_similar(query, k=5)
+            search_results = self.search_similar(query, k=5, mode=mode)
             
             # Convert search results back to Documents
             documents = []
@@ -0,0 +1,246 @@
+import pytest
+import sys
+import os
+import math
+import zlib
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from vector_store import AdvancedVectorStore
+
+
+class FakeEmbeddings:
+    """Deterministic bag-of-words embeddings that count API calls"""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.document_calls = 0
+        self.query_calls = 0
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode()) % self.dim] += 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        self.document_calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return self._embed(text)
+
+
+@pytest.fixture
+def store():
+    store = AdvancedVectorStore()
+    store.embedding_model = FakeEmbeddings()
+    return store
+
+
+def test_add_survey_embeds_eagerly(store):
+    """Documents are embedded at ingest, so search only embeds the query"""
+    store.add_survey("Portal is extremely slow", {"customer_id": "C1"})
+    store.add_survey("Billing invoices are wrong", {"customer_id": "C2"})
+    assert store.embedding_model.document_calls == 2
+    assert store.embeddings.shape == (2, 64)
+
+    store.search_similar("slow portal", k=1)
+    assert store.embedding_model.document_calls == 2
+    assert store.embedding_model.query_calls == 1
+
+
+def test_embedding_search_matches_brute_force(store):
+    """Top-k from the matrix product equals a full cosine sort"""
+    texts = [f"survey {i} mentions portal speed {i % 7} billing {i % 3}" for i in range(50)]
+    for i, text in enumerate(texts):
+        store.add_survey(text, {"survey_id": i})
+
+    query = "portal speed 3 billing 1"
+    results = store.search_similar(query, k=5)
+
+    model = store.embedding_model
+    q = np.asarray(model._embed(query))
+    scores = []
+    for text in texts:
+        d = np.asarray(model._embed(text))
+        scores.append(q @ d / (np.linalg.norm(q) * np.linalg.norm(d)))
+    expected = sorted(scores, reverse=True)[:5]
+
+    assert results["scores"] == pytest.approx(expected, abs=1e-5)
+    assert results["scores"] == sorted(results["scores"], reverse=True)
+
+
+def test_tied_scores_keep_ingest_order(store):
+    """Duplicate responses tie and come back in ingest order, including at the cut"""
+    store.add_surveys(["portal is slow"] * 30, [{"row": i} for i in range(30)])
+    for mode in ("dense", "keyword"):
+        results = store.search_similar("portal slow", k=5, mode=mode)
+        assert [m["row"] for m in results["metadatas"]] == [0, 1, 2, 3, 4]
+
+
+def test_failed_embeddings_are_retried_at_search(store):
+    """Chunks that failed to embed at ingest are embedded before the next search"""
+    working = store.embedding_model
+    store.embedding_model = None
+    store.add_survey("Portal is extremely slow", {"customer_id": "C1"})
+    store.embedding_model = working
+    store.add_survey("Billing invoices are wrong", {"customer_id": "C2"})
+
+    results = store.search_similar("portal slow", k=1)
+    assert results["metadatas"][0]["customer_id"] == "C1"
+    assert results["scores"][0] > 0.5
+
+
+def test_add_surveys_matches_add_survey(store):
+    """Bulk ingest batches the embedding calls and stores the same documents and vectors"""
+    texts = [f"response {i} about portal latency and billing {i % 5}" for i in range(23)]
+    metadatas = [{"survey_id": i} for i in range(23)]
+
+    single = AdvancedVectorStore()
+    single.embedding_model = FakeEmbeddings()
+    for text, metadata in zip(texts, metadatas):
+        single.add_survey(text, metadata)
+
+    assert store.add_surveys(texts, metadatas, batch_size=5) == 23
+    assert store.embedding_model.document_calls == 5
+    assert [doc.metadata for doc in store.documents] == [doc.metadata for doc in single.documents]
+    np.testing.assert_allclose(store.embeddings, single.embeddings, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        store.add_surveys(["only text"], [])
+
+
+def test_keyword_search_matches_bm25(store):
+    """Inverted-index scores equal BM25 computed directly over the corpus"""
+    store.embedding_model = None
+    texts = [
+        "Portal is slow, portal keeps timing out",
+        "Billing portal shows wrong invoices",
+        "API latency is fine but billing is slow",
+        "Great support team",
+    ] * 3
+    store.add_surveys(texts[:7], [{"row": i} for i in range(7)])
+    for i, text in enumerate(texts[7:], start=7):
+        store.add_survey(text, {"row": i})
+
+    results = store.search_similar("slow portal", k=4)
+
+    docs = [text.lower().replace(",", " ").split() for text in texts]
+    avg_length = sum(len(doc) for doc in docs) / len(docs)
+    expected = []
+    for doc in docs:
+        score = 0.0
+        for term in ("slow", "portal"):
+            df = sum(term in d for d in docs)
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            tf = doc.count(term)
+            score += idf * tf * 2.5 / (tf + 1.5 * (0.25 + 0.75 * len(doc) / avg_length))
+        expected.append(score)
+
+    assert results["scores"] == pytest.approx(sorted(expected, reverse=True)[:4], rel=1e-5)
+    assert results["metadatas"][0]["row"] % 4 == 0
+    assert store.search_similar("unrelated words", k=3)["documents"] == []
+
+
+def test_hybrid_search_fuses_dense_and_keyword(store):
+    """Reciprocal-rank fusion ranks documents found by both retrievers first"""
+    store.add_surveys(
+        [
+            "portal outage during billing run",
+            "portal outage again",
+            "invoice totals look wrong",
+            "support closed my ticket",
+        ],
+        [{"row": i} for i in range(4)]
+    )
+
+    dense_rows, _ = store._dense_ranking("portal outage billing", 4)
+    keyword_rows, _, _ = store._keyword_ranking("portal outage billing", 4)
+    results = store.search_similar("portal outage billing", k=2, mode="hybrid")
+
+    expected = {}
+    for ranking in (dense_rows, keyword_rows):
+        for rank, row in enumerate(ranking):
+            expected[row] = expected.get(row, 0.0) + 1 / (store.rrf_k + rank + 1)
+    best = sorted(expected, key=expected.get, reverse=True)[:2]
+    assert [m["row"] for m in results["metadatas"]] == best
+    assert results["scores"] == pytest.approx([expected[row] for row in best])
+    assert results["metadatas"][0]["row"] == 0
+
+    # Without embeddings hybrid degrades to the keyword ranking
+    store.embedding_model = None
+    keyword_only = store.search_similar("invoice totals", k=1, mode="hybrid")
+    assert keyword_only["metadatas"][0]["row"] == 2
+
+    with pytest.raises(ValueError):
+        store.search_similar("portal", mode="semantic")
+
+
+def test_persistent_store_reloads_and_appends(tmp_path):
+    """Documents, metadata and embeddings survive a restart and later appends extend the files"""
+    persist_dir = str(tmp_path / "store")
+    store = AdvancedVectorStore(persist_dir=persist_dir)
+    store.embedding_model = FakeEmbeddings()
+    store.add_surveys(
+        [f"survey {i} about portal outages {i % 4}" for i in range(40)],
+        [{"survey_id": i, "score": np.int64(i % 10)} for i in range(40)]
+    )
+    before = store.search_similar("portal outages 2", k=5)
+    store.close()
+
+    reopened = AdvancedVectorStore(persist_dir=persist_dir)
+    reopened.embedding_model = FakeEmbeddings()
+    assert reopened.count() == 40
+    keyword_before = store._keyword_search("portal outages 2", k=3)
+    assert reopened._keyword_search("portal outages 2", k=3) == keyword_before
+    assert reopened.documents[7].metadata["score"] == 7
+    assert reopened.search_similar("portal outages 2", k=5) == before
+    assert reopened.embedding_model.document_calls == 0
+
+    reopened.embedding_model = None
+    reopened.add_survey("billing export is broken", {"survey_id": 40})
+    reopened.embedding_model = FakeEmbeddings()
+    reopened.add_surveys(
+        [f"late survey {i} on billing exports" for i in range(30)],
+        [{"survey_id": 41 + i} for i in range(30)]
+    )
+    reopened.close()
+
+    final = AdvancedVectorStore(persist_dir=persist_dir)
+    final.embedding_model = FakeEmbeddings()
+    assert final.count() == 71
+    assert final._pending == [40]
+    results = final.search_similar("billing export is broken", k=1)
+    assert results["metadatas"][0]["survey_id"] == 40
+    np.testing.assert_allclose(final.embeddings[:40], store.embeddings[:40])
+    final.close()
+
+
+def test_failed_append_leaves_store_unchanged(tmp_path):
+    """A storage error during append rolls back instead of leaving a partial or duplicate row"""
+    store = AdvancedVectorStore(persist_dir=str(tmp_path / "store"))
+    store.embedding_model = FakeEmbeddings()
+    store.add_survey("Portal is extremely slow", {"survey_id": 0})
+
+    # A stray row where the next append will write makes the SQLite insert fail
+    with store._db:
+        store._db.execute("INSERT INTO documents VALUES (2, 'stray', '{}', 1)")
+    with pytest.raises(Exception):
+        store.add_surveys(["Billing is wrong", "Support is great"], [{"survey_id": 1}, {"survey_id": 2}])
+
+    assert store.count() == 1
+    assert len(store._doc_lengths) == 1
+    assert "billing" not in store._postings
+    assert store._pending == []
+
+    with store._db:
+        store._db.execute("DELETE FROM documents WHERE row = 2")
+    store.add_surveys(["Billing is wrong", "Support is great"], [{"survey_id": 1}, {"survey_id": 2}])
+    assert store.search_similar("billing wrong", k=1)["metadatas"][0]["survey_id"] == 1
+    store.close()
+
+    reopened = AdvancedVectorStore(persist_dir=str(tmp_path / "store"))
+    assert [doc.metadata["survey_id"] for doc in reopened.documents] == [0, 1, 2]
+    reopened.close()
@@ -0,0 +1,141 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    """Nearest centroid (by inner product) for each normalized row, in chunks."""
+    labels = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], chunk_size):
+        block = vectors[start : start + chunk_size]
+        labels[start : start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0
+) -> np.ndarray:
+    """
+    K-means on the unit sphere for L2-normalized float32 rows.
+
+    :param vectors: Normalized vectors to cluster
+    :param n_clusters: Number of centroids to learn
+    :param n_iter: Number of Lloyd iterations
+    :param seed: Seed for centroid initialization and empty-cluster reseeding
+    :return: Normalized centroid matrix of shape (n_clusters, dim)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index in pure NumPy.
+
+    A spherical k-means coarse quantizer partitions the rows into ``n_lists``
+    cells. A query only scores the rows in its ``nprobe`` closest cells, so
+    raising ``nprobe`` trades speed for recall. Collections smaller than
+    ``min_train_size`` are left untrained and searched exactly.
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        min_train_size: int = 4096,
+        n_iter: int = 10,
+        max_train_points: int = 256,
+        seed: int = 0,
+    ):
+        """
+        :param n_lists: Number of cells; defaults to sqrt(N) at training time
+        :param nprobe: Number of cells scanned per query
+        :param min_train_size: Below this many rows searches stay exact
+        :param n_iter: K-means iterations used when training
+        :param max_train_points: Training sample size per cell
+        :param seed: Seed for the k-means sampling
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.n_iter = n_iter
+        self.max_train_points = max_train_points
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._arrays: Dict[int, np.ndarray] = {}
+        self._row_list: Dict[int, int] = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, matrix: np.ndarray) -> None:
+        """Learns the coarse quantizer from ``matrix`` and indexes every row."""
+        n = matrix.shape[0]
+        n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+        sample_size = min(n, n_lists * self.max_train_points)
+        rng = np.random.default_rng(self.seed)
+        sample = matrix[np.sort(rng.choice(n, sample_size, replace=False))]
+        self.centroids = spherical_kmeans(
+            np.ascontiguousarray(sample), n_lists, self.n_iter, self.seed
+        )
+        self._lists = [[] for _ in range(self.centroids.shape[0])]
+        self._arrays = {}
+        self._row_list = {}
+        self.add(np.arange(n), matrix)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Assigns (or re-assigns) rows to their nearest cell."""
+        if not self.is_trained or len(rows) == 0:
+            return
+        labels = _assign(np.asarray(vectors, dtype=np.float32), self.centroids)
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            previous = self._row_list.get(row)
+            if previous == label:
+                continue
+            if previous is not None:
+                self._lists[previous].remove(row)
+                self._arrays.pop(previous, None)
+            self._lists[label].append(row)
+            self._arrays.pop(label, None)
+            self._row_list[row] = label
+
+    def remap(self, mapping: np.ndarray) -> None:
+        """Renumbers rows after compaction; ``mapping[old]`` is the new id or -1."""
+        lists = []
+        for rows in self._lists:
+            renumbered = mapping[np.asarray(rows, dtype=np.int64)]
+            lists.append(renumbered[renumbered >= 0].tolist())
+        self._lists = lists
+        self._arrays = {}
+        self._row_list = {row: label for label, rows in enumerate(lists) for row in rows}
+
+    def _list_array(self, label: int) -> np.ndarray:
+        # Cells only grow between trainings, so a cached array of the wrong
+        # length is stale even if a concurrent ``add`` has not evicted it yet.
+        rows = self._lists[label]
+        array = self._arrays.get(label)
+        if array is None or len(array) != len(rows):
+            array = np.asarray(rows, dtype=np.int64)
+            self._arrays[label] = array
+        return array
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Row ids in the ``nprobe`` cells closest to a normalized query."""
+        nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        arrays = [self._list_array(label) for label in probes.tolist()]
+        return np.sort(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.int64)
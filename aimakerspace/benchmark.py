@@ -0,0 +1,267 @@
+"""
+Offline retrieval benchmark for ``VectorDatabase``.
+
+Builds synthetic corpora with a deterministic fake embedding model and, for
+every corpus size and search mode, records build time, memory, single-query
+latency percentiles, batched throughput and recall@k against exact search.
+Results are written as JSON so runs from different commits can be diffed:
+
+    python -m aimakerspace.benchmark --sizes 1000,10000,100000 --output bench.json
+"""
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from aimakerspace.ann import IVFIndex
+from aimakerspace.quantization import ProductQuantizer, ScalarQuantizer
+from aimakerspace.vectordatabase import VectorDatabase
+import json
+import platform
+import subprocess
+import time
+import zlib
+
+
+class FakeEmbeddingModel:
+    """
+    Deterministic stand-in for ``EmbeddingModel`` that never calls the API.
+
+    Each text is hashed to pick one of ``n_clusters`` fixed centres and to
+    seed Gaussian noise around it, so the same text always gets the same
+    vector and the corpus has the clustered structure of real embeddings.
+    """
+
+    def __init__(
+        self,
+        dim: int = 384,
+        n_clusters: int = 256,
+        noise: float = 0.6,
+        seed: int = 0,
+        embeddings_model_name: str = "fake-embedding",
+    ):
+        self.dim = dim
+        self.noise = noise
+        self.embeddings_model_name = embeddings_model_name
+        rng = np.random.default_rng(seed)
+        self._centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+
+    def _embed(self, text: str) -> np.ndarray:
+        digest = zlib.crc32(text.encode("utf-8"))
+        noise = np.random.default_rng(digest).standard_normal(self.dim)
+        center = self._centers[digest % len(self._centers)]
+        return (center + self.noise * noise).astype(np.float32)
+
+    def get_embeddings(self, list_of_text: List[str]) -> List[np.ndarray]:
+        return [self._embed(text) for text in list_of_text]
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        return self._embed(text)
+
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[np.ndarray]:
+        return self.get_embeddings(list_of_text)
+
+    async def async_get_embedding(self, text: str) -> np.ndarray:
+        return self._embed(text)
+
+
+def _memory_bytes(db: VectorDatabase) -> Dict[str, int]:
+    """
+    Bytes held by the float vectors (with norms) and by the quantized codes.
+
+    With a quantizer the float rows are only read for re-ranking, so loading
+    with ``mmap=True`` leaves just ``code_bytes`` in private memory.
+    """
+    snap = db._snapshot
+    vector_bytes = snap.size * (
+        snap.matrix.shape[1] * snap.matrix.itemsize + snap.norms.itemsize
+    )
+    code_bytes = 0
+    if snap.codes is not None:
+        code_bytes = snap.size * snap.codes.shape[1] * snap.codes.itemsize
+    return {"vector_bytes": int(vector_bytes), "code_bytes": int(code_bytes)}
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def _recall(found: List[List[str]], truth: List[List[str]]) -> float:
+    return float(
+        np.mean([len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth)])
+    )
+
+
+def default_modes(dim: int) -> Dict[str, Callable[[], dict]]:
+    """Search modes to compare: name -> factory for ``VectorDatabase`` kwargs."""
+    modes = {
+        "exact": lambda: {},
+        "ivf": lambda: {"index": IVFIndex(min_train_size=0)},
+        "int8": lambda: {"quantizer": ScalarQuantizer(min_train_size=0)},
+        "ivf+int8": lambda: {
+            "index": IVFIndex(min_train_size=0),
+            "quantizer": ScalarQuantizer(min_train_size=0),
+        },
+    }
+    # PQ needs the dimension to split evenly into 4-dim slices
+    if dim % 4 == 0:
+        modes["pq"] = lambda: {
+            "quantizer": ProductQuantizer(n_subvectors=dim // 4, min_train_size=0)
+        }
+    return modes
+
+
+def run_benchmark(
+    sizes: List[int],
+    dim: int = 384,
+    k: int = 10,
+    n_queries: int = 200,
+    batch_size: int = 64,
+    modes: Optional[List[str]] = None,
+    seed: int = 0,
+) -> dict:
+    """
+    Benchmarks every mode at every corpus size.
+
+    :param sizes: Corpus sizes (number of vectors) to build
+    :param dim: Embedding dimension of the fake model
+    :param k: Results per query, also the recall cutoff
+    :param n_queries: Queries timed one at a time for the latency percentiles
+    :param batch_size: Queries per ``search_many`` call for the throughput figure
+    :param modes: Subset of ``default_modes`` to run (all if None)
+    :param seed: Seed for the fake model's cluster centres
+    :return: JSON-serializable dict with run metadata and one record per (size, mode)
+    """
+    model = FakeEmbeddingModel(dim=dim, seed=seed)
+    factories = default_modes(dim)
+    selected = modes or list(factories)
+    queries = np.stack(model.get_embeddings([f"query {i}" for i in range(n_queries)]))
+    filter_values = np.arange(n_queries) % 10
+
+    results = []
+    for size in sizes:
+        keys = [f"document {i}" for i in range(size)]
+        start = time.perf_counter()
+        vectors = np.stack(model.get_embeddings(keys))
+        embed_s = time.perf_counter() - start
+        metadatas = [{"shard": i % 10} for i in range(size)]
+
+        truth = None
+        for mode in selected:
+            db = VectorDatabase(model, indexed_fields=["shard"], **factories[mode]())
+            start = time.perf_counter()
+            db.insert_many(keys, vectors, metadatas)
+            if db.index is not None:
+                db.build_index()
+            if db.quantizer is not None:
+                db.build_quantizer()
+            build_s = time.perf_counter() - start
+            memory = _memory_bytes(db)
+
+            if truth is None:
+                truth = [
+                    [key for key, _ in db.search(q, k, exact=True)] for q in queries
+                ]
+                filtered_truth = [
+                    [key for key, _ in db.search(q, k, exact=True, where={"shard": int(v)})]
+                    for q, v in zip(queries, filter_values)
+                ]
+
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                found.append([key for key, _ in db.search(query, k)])
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for offset in range(0, n_queries, batch_size):
+                db.search_many(queries[offset : offset + batch_size], k)
+            batch_s = time.perf_counter() - start
+
+            filtered_latencies, filtered_found = [], []
+            for query, value in zip(queries, filter_values):
+                start = time.perf_counter()
+                hits = db.search(query, k, where={"shard": int(value)})
+                filtered_latencies.append(time.perf_counter() - start)
+                filtered_found.append([key for key, _ in hits])
+
+            record = {
+                "size": size,
+                "mode": mode,
+                "embed_s": embed_s,
+                "build_s": build_s,
+                **memory,
+                "code_bytes_per_vector": memory["code_bytes"] / size,
+                **_percentiles(latencies),
+                "batch_qps": n_queries / batch_s,
+                f"recall_at_{k}": _recall(found, truth),
+                "filtered": {
+                    **_percentiles(filtered_latencies),
+                    f"recall_at_{k}": _recall(filtered_found, filtered_truth),
+                },
+            }
+            results.append(record)
+            print(
+                f"{size:>8} {mode:>9}  build {build_s:7.2f}s  "
+                f"{memory['vector_bytes'] / size:5.0f}+{record['code_bytes_per_vector']:<4.0f} B/vec  "
+                f"p50 {record['p50_ms']:7.2f}ms  p99 {record['p99_ms']:7.2f}ms  "
+                f"{record['batch_qps']:8.0f} qps  recall@{k} {record[f'recall_at_{k}']:.3f}"
+            )
+            del db
+
+    return {"meta": _run_metadata(dim, k, n_queries, batch_size, seed), "results": results}
+
+
+def _run_metadata(dim: int, k: int, n_queries: int, batch_size: int, seed: int) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "dim": dim,
+        "k": k,
+        "n_queries": n_queries,
+        "batch_size": batch_size,
+        "seed": seed,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark VectorDatabase search modes")
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="Comma-separated corpus sizes, e.g. 1000,10000,100000,1000000",
+    )
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--batch-size", type=int, default=64, help="Queries per batch")
+    parser.add_argument(
+        "--modes",
+        default=None,
+        help="Comma-separated subset of: exact, ivf, int8, ivf+int8, pq",
+    )
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="Where to write the JSON"
+    )
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        dim=args.dim,
+        k=args.k,
+        n_queries=args.queries,
+        batch_size=args.batch_size,
+        modes=args.modes.split(",") if args.modes else None,
+    )
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
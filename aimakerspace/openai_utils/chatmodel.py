@@ -1,23 +1,81 @@
 from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+import httpx
 import os
 
 load_dotenv()
 
 
 class ChatOpenAI:
-    def __init__(self, model_name: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+    ):
+        """
+        :param model_name: OpenAI chat model to call
+        :param max_connections: Connection pool size shared by concurrent requests
+        :param max_keepalive_connections: Idle connections kept open for reuse
+        :param keepalive_expiry: Seconds an idle connection is kept alive
+        :param timeout: Overall request timeout in seconds
+        :param connect_timeout: Timeout for establishing a connection in seconds
+        """
         self.model_name = model_name
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         if self.openai_api_key is None:
             raise ValueError("OPENAI_API_KEY is not set")
 
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client(self) -> OpenAI:
+        """Long-lived sync client, created on first use and reused across calls."""
+        if self._client is None:
+            self._client = OpenAI(
+                timeout=self._timeout,
+                http_client=httpx.Client(limits=self._limits, timeout=self._timeout),
+            )
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Long-lived async client, created on first use and reused across calls."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                timeout=self._timeout,
+                http_client=httpx.AsyncClient(limits=self._limits, timeout=self._timeout),
+            )
+        return self._async_client
+
     def run(self, messages, text_only: bool = True, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
 
-        client = OpenAI()
-        response = client.chat.completions.create(
+        response = self.client.chat.completions.create(
+            model=self.model_name, messages=messages, **kwargs
+        )
+
+        if text_only:
+            return response.choices[0].message.content
+
+        return response
+
+    async def arun(self, messages, text_only: bool = True, **kwargs):
+        if not isinstance(messages, list):
+            raise ValueError("messages must be a list")
+
+        response = await self.async_client.chat.completions.create(
             model=self.model_name, messages=messages, **kwargs
         )
 
@@ -25,14 +83,12 @@ class ChatOpenAI:
             return response.choices[0].message.content
 
         return response
-    
+
     async def astream(self, messages, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
-        
-        client = AsyncOpenAI()
 
-        stream = await client.chat.completions.create(
+        stream = await self.async_client.chat.completions.create(
             model=self.model_name,
             messages=messages,
             stream=True,
@@ -43,3 +99,16 @@ class ChatOpenAI:
             content = chunk.choices[0].delta.content
             if content is not None:
                 yield content
+
+    def close(self) -> None:
+        """Closes the sync client's connection pool."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        """Closes both connection pools."""
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
@@ -1,17 +1,55 @@
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, OpenAI
 import openai
-from typing import List
+from typing import List, Optional, Tuple
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
 import os
 import asyncio
+import random
+import time
+
+try:
+    import tiktoken
+except ImportError:  # token budgeting falls back to a character estimate
+    tiktoken = None
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
 
 
 class EmbeddingModel:
-    def __init__(self, embeddings_model_name: str = "text-embedding-3-small"):
+    def __init__(
+        self,
+        embeddings_model_name: str = "text-embedding-3-small",
+        batch_size: int = 1024,
+        max_batch_tokens: int = 250_000,
+        max_concurrency: int = 8,
+        max_retries: int = 6,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        """
+        :param embeddings_model_name: OpenAI embedding model to call
+        :param batch_size: Maximum number of inputs sent in one request
+        :param max_batch_tokens: Maximum (estimated) tokens sent in one request
+        :param max_concurrency: Maximum number of requests in flight at once
+        :param max_retries: Retries for a batch on 429/5xx/connection errors
+        :param backoff_base: First retry delay in seconds, doubled per attempt
+        :param backoff_max: Upper bound on a single retry delay in seconds
+        :param cache: Optional cache; only texts it misses are sent to the API
+        """
         load_dotenv()
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.async_client = AsyncOpenAI()
-        self.client = OpenAI()
+        # The SDK's own retries would multiply with ours; max_retries/backoff_* are the only policy
+        self.async_client = AsyncOpenAI(max_retries=0)
+        self.client = OpenAI(max_retries=0)
 
         if self.openai_api_key is None:
             raise ValueError(
@@ -19,34 +57,144 @@ class EmbeddingModel:
             )
         openai.api_key = self.openai_api_key
         self.embeddings_model_name = embeddings_model_name
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self._encoding = None
 
-    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = await self.async_client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
+    def _lookup(self, list_of_text: List[str]) -> Tuple[List, List[str]]:
+        """Returns cached results (None on miss) and the unique missed texts."""
+        keys = [EmbeddingCache.make_key(self.embeddings_model_name, t) for t in list_of_text]
+        results = self.cache.get_many(keys)
+        misses = list(dict.fromkeys(t for t, r in zip(list_of_text, results) if r is None))
+        return results, misses
+
+    def _fill(self, list_of_text, results, misses, embeddings) -> List[List[float]]:
+        """Stores freshly fetched embeddings and merges them with the cached ones."""
+        # Misses are returned as stored (float32), so a text's embedding is the
+        # same whether or not it was served from the cache
+        stored = self.cache.put_many(
+            [EmbeddingCache.make_key(self.embeddings_model_name, t) for t in misses],
+            embeddings,
         )
+        fetched = dict(zip(misses, stored))
+        return [r if r is not None else fetched[t] for t, r in zip(list_of_text, results)]
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
+    def _count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            self._encoding = False
+            if tiktoken is not None:
+                # The encoding files are downloaded on first use; stay usable offline
+                try:
+                    try:
+                        encoding = tiktoken.encoding_for_model(self.embeddings_model_name)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding("cl100k_base")
+                    self._encoding = encoding
+                except Exception:
+                    pass
+        if not self._encoding:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
 
-    async def async_get_embedding(self, text: str) -> List[float]:
-        embedding = await self.async_client.embeddings.create(
-            input=text, model=self.embeddings_model_name
+    def _batches(self, list_of_text: List[str]) -> List[List[str]]:
+        """Splits inputs into consecutive batches within the item and token limits."""
+        batches, batch, batch_tokens = [], [], 0
+        for text in list_of_text:
+            tokens = self._count_tokens(text)
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return delay * (0.5 + random.random() / 2)
+
+    async def _aembed_batch(
+        self, batch: List[str], semaphore: asyncio.Semaphore
+    ) -> List[List[float]]:
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    embedding_response = await self.async_client.embeddings.create(
+                        input=batch, model=self.embeddings_model_name
+                    )
+                    return [embeddings.embedding for embeddings in embedding_response.data]
+                except Exception as e:
+                    if attempt == self.max_retries or not _is_retryable(e):
+                        raise
+                    await asyncio.sleep(self._backoff(attempt))
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                embedding_response = self.client.embeddings.create(
+                    input=batch, model=self.embeddings_model_name
+                )
+                return [embeddings.embedding for embeddings in embedding_response.data]
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                time.sleep(self._backoff(attempt))
+
+    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        """
+        Embeds any number of texts, batching by item count and token budget.
+
+        Batches run concurrently (at most ``max_concurrency`` in flight) and the
+        embeddings are returned in the same order as ``list_of_text``.
+        """
+        if self.cache is not None:
+            results, misses = self._lookup(list_of_text)
+            embeddings = await self._afetch_embeddings(misses) if misses else []
+            return self._fill(list_of_text, results, misses, embeddings)
+        return await self._afetch_embeddings(list_of_text)
+
+    async def _afetch_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(
+            *[self._aembed_batch(batch, semaphore) for batch in self._batches(list_of_text)]
         )
+        return [embedding for batch_result in results for embedding in batch_result]
 
-        return embedding.data[0].embedding
+    async def async_get_embedding(self, text: str) -> List[float]:
+        if self.cache is not None:
+            return (await self.async_get_embeddings([text]))[0]
+        # Same retry and backoff as the batch path
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return (await self._aembed_batch([text], semaphore))[0]
 
     def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = self.client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
-        )
+        if self.cache is not None:
+            results, misses = self._lookup(list_of_text)
+            embeddings = self._fetch_embeddings(misses) if misses else []
+            return self._fill(list_of_text, results, misses, embeddings)
+        return self._fetch_embeddings(list_of_text)
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
+    def _fetch_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        return [
+            embedding
+            for batch in self._batches(list_of_text)
+            for embedding in self._embed_batch(batch)
+        ]
 
     def get_embedding(self, text: str) -> List[float]:
-        embedding = self.client.embeddings.create(
-            input=text, model=self.embeddings_model_name
-        )
-
-        return embedding.data[0].embedding
+        if self.cache is not None:
+            return self.get_embeddings([text])[0]
+        # Same retry and backoff as the batch path
+        return self._embed_batch([text])[0]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for embeddings.
+
+    Entries are keyed by a SHA-256 of (model name, text). A bounded in-memory
+    LRU tier sits in front of an optional SQLite file that stores each vector
+    as a float32 blob, so embeddings survive restarts and can be shared
+    between processes.
+    """
+
+    def __init__(self, max_memory_items: int = 10_000, path: Optional[str] = None):
+        """
+        :param max_memory_items: Capacity of the in-memory LRU tier
+        :param path: SQLite file for the persistent tier (memory only if None)
+        """
+        self.max_memory_items = max_memory_items
+        self.path = path
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Looks up each key; ``None`` marks a miss."""
+        with self._lock:
+            found: Dict[str, np.ndarray] = {}
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+
+            pending = [key for key in set(keys) if key not in found]
+            if pending and self._db is not None:
+                for start in range(0, len(pending), 500):
+                    chunk = pending[start : start + 500]
+                    rows = self._db.execute(
+                        "SELECT key, vector FROM embeddings WHERE key IN "
+                        f"({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+
+            results = []
+            for key in keys:
+                vector = found.get(key)
+                if vector is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(vector.tolist())
+            return results
+
+    def put_many(self, keys: List[str], embeddings: List[List[float]]) -> List[List[float]]:
+        """
+        Stores embeddings as float32 and returns them as stored, i.e. the same
+        values a later ``get_many`` hit returns for these keys.
+        """
+        with self._lock:
+            vectors = [np.asarray(e, dtype=np.float32) for e in embeddings]
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in zip(keys, vectors)],
+                )
+                self._db.commit()
+            return [vector.tolist() for vector in vectors]
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters plus the current in-memory size."""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_items": len(self._memory),
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,4 +1,104 @@
 import re
+from functools import lru_cache
+from itertools import repeat
+from string import Formatter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+_PLACEHOLDER = re.compile(r"\{([^}]+)\}")
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+class CompiledTemplate(NamedTuple):
+    """
+    A ``str.format`` template split once into literal text and placeholders.
+
+    ``literals[i]`` is followed by ``fields[i]`` (name, format spec,
+    conversion), or by nothing when the field is None. ``simple`` is set
+    when no field uses a spec or conversion, so rendering is just ``str``.
+    """
+
+    literals: Tuple[str, ...]
+    fields: Tuple[Optional[Tuple[str, str, Optional[str]]], ...]
+    simple: bool
+    variables: Tuple[str, ...]
+
+    def render(self, values: dict) -> str:
+        """Substitutes ``values`` (missing names render as "") in a single join."""
+        get = values.get
+        if self.simple:
+            rendered = ["" if f is None else str(get(f[0], "")) for f in self.fields]
+        else:
+            rendered = [
+                "" if f is None else _format_field(get(f[0], ""), f[1], f[2])
+                for f in self.fields
+            ]
+        parts = [None] * (2 * len(self.literals))
+        parts[0::2] = self.literals
+        parts[1::2] = rendered
+        return "".join(parts)
+
+    def render_columns(self, columns: Dict[str, List[Any]], n_rows: int) -> List[str]:
+        """Renders ``n_rows`` outputs from per-variable value columns, column by column."""
+        if not any(self.fields):
+            return ["".join(self.literals)] * n_rows
+        pieces = []
+        for literal, field in zip(self.literals, self.fields):
+            if literal:
+                pieces.append(repeat(literal))
+            if field is None:
+                continue
+            values = columns.get(field[0]) or repeat("", n_rows)
+            if self.simple or not (field[1] or field[2]):
+                pieces.append(map(str, values))
+            else:
+                pieces.append([_format_field(v, field[1], field[2]) for v in values])
+        return ["".join(row) for row in zip(*pieces)]
+
+
+def _frame_column(series: Any, default: Any) -> List[Any]:
+    """A DataFrame column as Python values, with missing cells replaced by ``default``."""
+    missing = series.isna()
+    if not missing.any():
+        return series.tolist()
+    # A gap upcasts an int column to float; convert_dtypes restores the ints
+    values = series.convert_dtypes().astype(object).tolist()
+    return [default if gap else value for value, gap in zip(values, missing.tolist())]
+
+
+def _as_columns(rows: Any, names: Tuple[str, ...]) -> Tuple[Dict[str, List[Any]], int]:
+    """
+    One value list per template variable from a list of dicts or a pandas
+    DataFrame; a missing variable or a missing (NaN) cell renders as "".
+    """
+    if hasattr(rows, "columns") and hasattr(rows, "to_dict"):
+        n_rows = len(rows)
+        return {
+            name: _frame_column(rows[name], "") if name in rows.columns else [""] * n_rows
+            for name in set(names)
+        }, n_rows
+    rows = list(rows)
+    return {name: [row.get(name, "") for row in rows] for name in set(names)}, len(rows)
+
+
+def _format_field(value, spec: str, conversion: Optional[str]) -> str:
+    if conversion:
+        value = _CONVERSIONS[conversion](value)
+    return format(value, spec)
+
+
+@lru_cache(maxsize=512)
+def compile_template(template: str) -> CompiledTemplate:
+    """Parses ``template`` once; repeated prompts share the cached result."""
+    literals, fields = [], []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        literals.append(literal)
+        fields.append(None if name is None else (name, spec or "", conversion))
+    return CompiledTemplate(
+        literals=tuple(literals),
+        fields=tuple(fields),
+        simple=all(f is None or not (f[1] or f[2]) for f in fields),
+        variables=tuple(_PLACEHOLDER.findall(template)),
+    )
 
 
 class BasePrompt:
@@ -9,7 +109,11 @@ class BasePrompt:
         :param prompt: A string that can contain placeholders within curly braces
         """
         self.prompt = prompt
-        self._pattern = re.compile(r"\{([^}]+)\}")
+
+    @property
+    def compiled(self) -> CompiledTemplate:
+        """The parsed template, recompiled only if ``prompt`` is reassigned."""
+        return compile_template(self.prompt)
 
     def format_prompt(self, **kwargs):
         """
@@ -18,8 +122,7 @@ class BasePrompt:
         :param kwargs: The values to substitute into the prompt string
         :return: The formatted prompt string
         """
-        matches = self._pattern.findall(self.prompt)
-        return self.prompt.format(**{match: kwargs.get(match, "") for match in matches})
+        return self.compiled.render(kwargs)
 
     def get_input_variables(self):
         """
@@ -27,7 +130,7 @@ class BasePrompt:
 
         :return: List of input variable names
         """
-        return self._pattern.findall(self.prompt)
+        return list(self.compiled.variables)
 
 
 class RolePrompt(BasePrompt):
@@ -53,6 +156,22 @@ class RolePrompt(BasePrompt):
         
         return {"role": self.role, "content": self.prompt}
 
+    def create_messages(self, rows):
+        """
+        Creates one message per row of variables, reusing the compiled template.
+
+        :param rows: A list of variable dicts or a pandas DataFrame (one column per variable)
+        :return: List of message dictionaries, in row order
+        """
+        compiled = self.compiled
+        names = tuple(f[0] for f in compiled.fields if f is not None)
+        columns, n_rows = _as_columns(rows, names)
+        role = self.role
+        return [
+            {"role": role, "content": content}
+            for content in compiled.render_columns(columns, n_rows)
+        ]
+
 
 class SystemRolePrompt(RolePrompt):
     def __init__(self, prompt: str):
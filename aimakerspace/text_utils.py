@@ -1,7 +1,35 @@
 import os
-from typing import List
+import re
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 import PyPDF2
 
+try:
+    import tiktoken
+except ImportError:  # only TokenTextSplitter needs it
+    tiktoken = None
+
+
+class Document(NamedTuple):
+    """A loaded document (or PDF page) and where it came from."""
+
+    text: str
+    metadata: dict
+
+
+class TextSpan(NamedTuple):
+    """A chunk referenced by offsets into its source document instead of a copy."""
+
+    doc_id: Any
+    start: int
+    end: int
+
+    def materialize(self, text: str) -> str:
+        """Returns the chunk text given the full text of document ``doc_id``."""
+        return text[self.start : self.end]
+
 
 class TextFileLoader:
     def __init__(self, path: str, encoding: str = "utf-8"):
@@ -20,17 +48,36 @@ class TextFileLoader:
             )
 
     def load_file(self):
-        with open(self.path, "r", encoding=self.encoding) as f:
-            self.documents.append(f.read())
+        self.documents.extend(document.text for document in self.iter_documents())
 
     def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(".txt"):
-                    with open(
-                        os.path.join(root, file), "r", encoding=self.encoding
-                    ) as f:
-                        self.documents.append(f.read())
+        self.documents.extend(document.text for document in self.iter_documents())
+
+    def _iter_paths(self) -> Iterator[str]:
+        if os.path.isdir(self.path):
+            # Sorted like PDFLoader so both loaders return files in the same order
+            for root, dirs, files in os.walk(self.path):
+                dirs.sort()
+                for file in sorted(files):
+                    if file.endswith(".txt"):
+                        yield os.path.join(root, file)
+        elif os.path.isfile(self.path) and self.path.endswith(".txt"):
+            yield self.path
+        else:
+            raise ValueError(
+                "Provided path is neither a valid directory nor a .txt file."
+            )
+
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        Lazily yields one ``Document`` per file without storing it on the loader.
+
+        Only the file currently being yielded is held in memory, so this scales
+        to directories far larger than RAM.
+        """
+        for file_path in self._iter_paths():
+            with open(file_path, "r", encoding=self.encoding) as f:
+                yield Document(f.read(), {"source": file_path})
 
     def load_documents(self):
         self.load()
@@ -50,23 +97,203 @@ class CharacterTextSplitter:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
+    def _offsets(self, length: int) -> Iterator[Tuple[int, int]]:
+        for i in range(0, length, self.chunk_size - self.chunk_overlap):
+            yield i, min(i + self.chunk_size, length)
+
     def split(self, text: str) -> List[str]:
         chunks = []
-        for i in range(0, len(text), self.chunk_size - self.chunk_overlap):
-            chunks.append(text[i : i + self.chunk_size])
+        for start, end in self._offsets(len(text)):
+            chunks.append(text[start:end])
         return chunks
 
-    def split_texts(self, texts: List[str]) -> List[str]:
+    def split_spans(self, text: str, doc_id: Any = 0) -> List[TextSpan]:
+        """Same chunk boundaries as ``split`` but returned as offsets only."""
+        return [TextSpan(doc_id, start, end) for start, end in self._offsets(len(text))]
+
+    def split_texts(
+        self, texts: List[str], as_spans: bool = False
+    ) -> Union[List[str], List[TextSpan]]:
+        """
+        Splits every text; with ``as_spans`` returns ``TextSpan`` records whose
+        ``doc_id`` is the index into ``texts`` instead of copying chunk text.
+        """
         chunks = []
-        for text in texts:
-            chunks.extend(self.split(text))
+        for doc_id, text in enumerate(texts):
+            chunks.extend(self.split_spans(text, doc_id) if as_spans else self.split(text))
         return chunks
 
+    def iter_split(
+        self,
+        documents: Iterable[Union[str, Document]],
+        with_spans: bool = False,
+    ) -> Iterator[Union[str, Tuple[TextSpan, str]]]:
+        """
+        Streams chunks from an iterable (e.g. ``loader.iter_documents()``).
+
+        Only one document is held at a time, so chunking can feed batched
+        embedding directly. With ``with_spans`` each chunk is paired with its
+        ``TextSpan``; the span's ``doc_id`` is the document's ``source``
+        metadata (``(source, page)`` for PDF pages) if present, otherwise its
+        position in the stream.
+        """
+        for position, document in enumerate(documents):
+            if isinstance(document, Document):
+                text, metadata = document.text, document.metadata
+                doc_id = metadata.get("source", position)
+                if "page" in metadata:
+                    doc_id = (doc_id, metadata["page"])
+            else:
+                text, doc_id = document, position
+            for start, end in self._offsets(len(text)):
+                chunk = text[start:end]
+                yield (TextSpan(doc_id, start, end), chunk) if with_spans else chunk
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = "cl100k_base", model_name: Optional[str] = None):
+    """
+    Returns a tiktoken encoding, loaded once per process and then cached.
+
+    :param name: Encoding name, used when ``model_name`` is not given
+    :param model_name: Model whose encoding should be used (e.g. "gpt-4o")
+    """
+    if tiktoken is None:
+        raise ImportError("TokenTextSplitter requires tiktoken: pip install tiktoken")
+    if model_name is not None:
+        return tiktoken.encoding_for_model(model_name)
+    return tiktoken.get_encoding(name)
+
+
+class TokenTextSplitter:
+    """
+    Splits text into windows of at most ``chunk_size`` tokens.
+
+    Each document is tokenized once (sentence by sentence, so sentence
+    boundaries are known in token space) and the window slides over the token
+    ids. Chunk ends and overlap starts snap to the nearest sentence boundary
+    when one lies within the window; sentences longer than a chunk are cut.
+    """
+
+    _sentence_end = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        encoding_name: str = "cl100k_base",
+        model_name: Optional[str] = None,
+        min_chunk_ratio: float = 0.5,
+    ):
+        """
+        :param chunk_size: Maximum tokens per chunk
+        :param chunk_overlap: Tokens shared between consecutive chunks
+        :param encoding_name: tiktoken encoding to use
+        :param model_name: Model name to pick the encoding from instead
+        :param min_chunk_ratio: Don't snap a chunk end to a sentence boundary
+            that would leave the chunk shorter than this fraction of chunk_size
+        """
+        assert (
+            chunk_size > chunk_overlap
+        ), "Chunk size must be greater than chunk overlap"
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding_name = encoding_name
+        self.model_name = model_name
+        self.min_chunk_ratio = min_chunk_ratio
+
+    @property
+    def encoding(self):
+        return get_encoding(self.encoding_name, self.model_name)
+
+    def _sentences(self, text: str) -> List[str]:
+        sentences, start = [], 0
+        for match in self._sentence_end.finditer(text):
+            sentences.append(text[start : match.end()])
+            start = match.end()
+        if start < len(text):
+            sentences.append(text[start:])
+        return sentences
+
+    def _windows(self, n_tokens: int, boundaries: List[int]) -> Iterator[Tuple[int, int]]:
+        """Token (start, end) windows snapped to the sorted sentence ``boundaries``."""
+        min_length = int(self.chunk_size * self.min_chunk_ratio)
+        start = 0
+        while start < n_tokens:
+            end = start + self.chunk_size
+            if end >= n_tokens:
+                yield start, n_tokens
+                return
+            i = bisect_right(boundaries, end) - 1
+            snapped = i >= 0 and boundaries[i] - start >= max(min_length, 1)
+            if snapped:
+                end = boundaries[i]
+            yield start, end
+
+            # Start the overlap on a sentence boundary; if none falls inside the
+            # overlap window, a snapped chunk is followed without overlap.
+            next_start = end - self.chunk_overlap
+            j = bisect_left(boundaries, next_start)
+            if j < len(boundaries) and boundaries[j] < end:
+                next_start = boundaries[j]
+            elif snapped:
+                next_start = end
+            start = max(next_start, start + 1)
+
+    def _split_tokens(self, sentence_tokens: List[List[int]]) -> List[str]:
+        tokens, boundaries = [], []
+        for ids in sentence_tokens:
+            tokens.extend(ids)
+            boundaries.append(len(tokens))
+        decode = self.encoding.decode
+        return [decode(tokens[start:end]) for start, end in self._windows(len(tokens), boundaries)]
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def split(self, text: str) -> List[str]:
+        return self._split_tokens(self.encoding.encode_ordinary_batch(self._sentences(text)))
+
+    def split_texts(self, texts: List[str]) -> List[str]:
+        """Splits many texts, tokenizing all their sentences in one batch call."""
+        per_text = [self._sentences(text) for text in texts]
+        encoded = self.encoding.encode_ordinary_batch(
+            [sentence for sentences in per_text for sentence in sentences]
+        )
+        chunks, offset = [], 0
+        for sentences in per_text:
+            chunks.extend(self._split_tokens(encoded[offset : offset + len(sentences)]))
+            offset += len(sentences)
+        return chunks
+
+
+def _extract_page_range(task: Tuple[str, int, Optional[int]]) -> str:
+    """Extracts pages [start, stop) of one PDF; runs inside pool workers."""
+    file_path, start, stop = task
+    with open(file_path, 'rb') as file:
+        pages = PyPDF2.PdfReader(file).pages
+        stop = len(pages) if stop is None else min(stop, len(pages))
+        return "".join(pages[i].extract_text() + "\n" for i in range(start, stop))
+
 
 class PDFLoader:
-    def __init__(self, path: str):
+    def __init__(
+        self,
+        path: str,
+        max_workers: Optional[int] = None,
+        pages_per_task: Optional[int] = None,
+    ):
+        """
+        :param path: A PDF file or a directory searched recursively for PDFs
+        :param max_workers: Processes used by ``load_directory``; serial if None or 1
+        :param pages_per_task: If set, large PDFs are split into page ranges of
+            this size so a single big file is also spread across workers
+        """
         self.documents = []
         self.path = path
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
         print(f"PDFLoader initialized with path: {self.path}")
 
     def load(self):
@@ -77,6 +304,11 @@ class PDFLoader:
         print(f"File permissions: {oct(os.stat(self.path).st_mode)[-3:]}")
         
         try:
+            # Directories go through load_directory (and its worker pool)
+            if os.path.isdir(self.path):
+                self.load_directory()
+                return
+
             # Try to open the file first to verify access
             with open(self.path, 'rb') as test_file:
                 pass
@@ -90,31 +322,72 @@ class PDFLoader:
             raise ValueError(f"Error processing file at '{self.path}': {str(e)}")
 
     def load_file(self):
-        with open(self.path, 'rb') as file:
-            # Create PDF reader object
+        self.documents.append(self._read_pdf(self.path))
+
+    def load_directory(self):
+        if self.max_workers is None or self.max_workers <= 1:
+            for file_path in self._iter_paths():
+                self.documents.append(self._read_pdf(file_path))
+            return
+
+        file_paths = list(self._iter_paths())
+        tasks, owners = [], []
+        for index, file_path in enumerate(file_paths):
+            for task in self._page_ranges(file_path):
+                tasks.append(task)
+                owners.append(index)
+
+        parts = [[] for _ in file_paths]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            # map() yields in submission order, so output order is deterministic
+            for owner, text in zip(owners, executor.map(_extract_page_range, tasks)):
+                parts[owner].append(text)
+        self.documents.extend("".join(part) for part in parts)
+
+    def _page_ranges(self, file_path: str) -> List[Tuple[str, int, Optional[int]]]:
+        if not self.pages_per_task:
+            return [(file_path, 0, None)]
+        with open(file_path, 'rb') as file:
+            page_count = len(PyPDF2.PdfReader(file).pages)
+        return [
+            (file_path, start, start + self.pages_per_task)
+            for start in range(0, max(page_count, 1), self.pages_per_task)
+        ]
+
+    @staticmethod
+    def _iter_pages(file_path: str) -> Iterator[str]:
+        with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            
-            # Extract text from each page
-            text = ""
             for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            self.documents.append(text)
+                yield page.extract_text()
 
-    def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
+    def _read_pdf(self, file_path: str) -> str:
+        # Join once instead of repeated += which is quadratic on large PDFs
+        return "".join(page + "\n" for page in self._iter_pages(file_path))
+
+    def _iter_paths(self) -> Iterator[str]:
+        if os.path.isfile(self.path):
+            yield self.path
+            return
+        for root, dirs, files in os.walk(self.path):
+            dirs.sort()
+            for file in sorted(files):
                 if file.lower().endswith('.pdf'):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'rb') as f:
-                        pdf_reader = PyPDF2.PdfReader(f)
-                        
-                        # Extract text from each page
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                        
-                        self.documents.append(text)
+                    yield os.path.join(root, file)
+
+    def iter_documents(self, per_page: bool = False) -> Iterator[Document]:
+        """
+        Lazily yields PDFs from ``path`` (a file or a directory) one at a time.
+
+        :param per_page: Yield one ``Document`` per page instead of per file
+        :return: Iterator of documents with ``source`` (and ``page``) metadata
+        """
+        for file_path in self._iter_paths():
+            if per_page:
+                for page_number, text in enumerate(self._iter_pages(file_path)):
+                    yield Document(text, {"source": file_path, "page": page_number})
+            else:
+                yield Document(self._read_pdf(file_path), {"source": file_path})
 
     def load_documents(self):
         self.load()
@@ -1,8 +1,24 @@
 import numpy as np
-from collections import defaultdict
-from typing import List, Tuple, Callable
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Callable, Union
+from aimakerspace.ann import IVFIndex
+from aimakerspace.quantization import ProductQuantizer, ScalarQuantizer
 from aimakerspace.openai_utils.embedding import EmbeddingModel
 import asyncio
+import copy
+import datetime
+import functools
+import json
+import os
+import shutil
+import threading
+
+_FORMAT_VERSION = 1
+_VECTORS_FILE = "vectors.npy"
+_NORMS_FILE = "norms.npy"
+_KEYS_FILE = "keys.json"
+_CURRENT_FILE = "CURRENT"
+
+Quantizer = Union[ScalarQuantizer, ProductQuantizer]
 
 
 def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
@@ -13,44 +29,962 @@ def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
     return dot_product / (norm_a * norm_b)
 
 
+def euclidean_distance(vector_a: np.array, vector_b: np.array) -> float:
+    """Computes the Euclidean distance between two vectors."""
+    return np.sqrt(np.sum((vector_a - vector_b) ** 2))
+
+
+def normalized_euclidean_distance(vector_a: np.array, vector_b: np.array) -> float:
+    """
+    Computes the normalized Euclidean distance between two vectors.
+    Returns a value between 0 and 1, where 0 = identical vectors.
+    """
+    distance = euclidean_distance(vector_a, vector_b)
+    # Normalize by maximum possible distance (sqrt of vector dimension)
+    max_possible_distance = np.sqrt(len(vector_a))
+    return min(distance / max_possible_distance, 1.0)
+
+
+class Metric(NamedTuple):
+    """
+    A batched scoring kernel and the direction its scores rank in.
+
+    ``score(queries, unit_rows, row_norms)`` receives raw query vectors
+    (m, d), the stored rows normalized to unit length (n, d) and their
+    original norms (n,), and returns an (m, n) score matrix in one call.
+    """
+
+    name: str
+    score: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+    higher_is_better: bool
+
+
+def _cosine_scores(queries, unit_rows, row_norms):
+    unit_queries, _ = _normalize(queries)
+    return unit_queries @ unit_rows.T
+
+
+def _dot_scores(queries, unit_rows, row_norms):
+    return (queries @ unit_rows.T) * row_norms
+
+
+def _euclidean_scores(queries, unit_rows, row_norms):
+    # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x, without materializing q - x
+    squared = (
+        np.sum(queries * queries, axis=1)[:, None]
+        + (row_norms * row_norms)[None, :]
+        - 2.0 * _dot_scores(queries, unit_rows, row_norms)
+    )
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def _normalized_euclidean_scores(queries, unit_rows, row_norms):
+    return np.minimum(
+        _euclidean_scores(queries, unit_rows, row_norms) / np.sqrt(queries.shape[1]),
+        1.0,
+    )
+
+
+METRICS: Dict[str, Metric] = {}
+
+
+def register_metric(metric: Metric, *aliases: str) -> None:
+    """Makes ``metric`` available to ``search`` under its name and any aliases."""
+    for name in (metric.name, *aliases):
+        METRICS[name] = metric
+
+
+register_metric(Metric("cosine", _cosine_scores, True), "cosine_similarity")
+register_metric(Metric("dot", _dot_scores, True), "inner_product")
+register_metric(Metric("euclidean", _euclidean_scores, False), "l2")
+register_metric(
+    Metric("normalized_euclidean", _normalized_euclidean_scores, False),
+    "normalized_l2",
+)
+
+# The per-pair functions above map onto their batched equivalents
+_CALLABLE_METRICS = {
+    cosine_similarity: "cosine",
+    euclidean_distance: "euclidean",
+    normalized_euclidean_distance: "normalized_euclidean",
+}
+
+
+def resolve_metric(distance_measure: Union[str, Callable, Metric]) -> Optional[Metric]:
+    """
+    Looks up the batched metric for a name, ``Metric`` or known pair function.
+
+    Returns None for an arbitrary callable, which is then scored per pair.
+    """
+    if isinstance(distance_measure, Metric):
+        return distance_measure
+    if isinstance(distance_measure, str):
+        if distance_measure not in METRICS:
+            raise ValueError(
+                f"Unknown metric '{distance_measure}'. Available: {sorted(METRICS)}"
+            )
+        return METRICS[distance_measure]
+    name = _CALLABLE_METRICS.get(distance_measure)
+    return METRICS[name] if name else None
+
+
+def _normalize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns L2-normalized rows and their original norms (zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=-1).astype(np.float32)
+    safe = np.where(norms == 0, 1.0, norms).astype(np.float32)
+    return (vectors / safe[..., None]).astype(np.float32), norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, ties broken by row order."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
+def _as_values(value: Any) -> Iterable[Any]:
+    """A metadata value as the set of terms it matches (list items match individually)."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return value
+    return (value,)
+
+
+def _matches(metadata: Optional[dict], field: str, wanted: Set[Any]) -> bool:
+    if not metadata or field not in metadata:
+        return False
+    return any(v in wanted for v in _as_values(metadata[field]))
+
+
+def _json_default(value: Any) -> Any:
+    """JSON fallback for item metadata: NumPy scalars, sets and dates."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _read_current(path: str) -> Optional[str]:
+    """The version directory ``CURRENT`` points to, or None for a flat save."""
+    try:
+        with open(os.path.join(path, _CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _new_version(path: str) -> str:
+    """Creates and returns the next unused ``v<N>`` directory under ``path``."""
+    versions = [
+        int(name[1:]) for name in os.listdir(path) if name[:1] == "v" and name[1:].isdigit()
+    ]
+    number = max(versions, default=0) + 1
+    while True:
+        try:
+            os.mkdir(os.path.join(path, f"v{number}"))
+            return f"v{number}"
+        except FileExistsError:
+            number += 1
+
+
+def _replace_file(path: str, content: str) -> None:
+    """Writes ``content`` to a temp file beside ``path`` and renames it into place."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class _AttributeIndex:
+    """
+    Inverted index from (field, value) to the rows carrying that value.
+
+    Rows are only ever appended, so every posting list is already sorted and
+    a reader can take a prefix of it without locking. Superseded and deleted
+    rows stay listed until compaction; searches drop them with the live mask.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = list(fields)
+        self._postings: Dict[str, Dict[Any, List[int]]] = {f: {} for f in self.fields}
+        self._arrays: Dict[Tuple[str, Any], np.ndarray] = {}
+
+    def add(self, row: int, metadata: Optional[dict]) -> None:
+        if not metadata:
+            return
+        for field in self.fields:
+            if field not in metadata:
+                continue
+            postings = self._postings[field]
+            values = [v for v in _as_values(metadata[field]) if v.__hash__ is not None]
+            for value in dict.fromkeys(values):
+                postings.setdefault(value, []).append(row)
+
+    def rows(self, field: str, value: Any) -> np.ndarray:
+        """Sorted row ids whose ``field`` holds ``value``, dead rows included."""
+        posting = self._postings[field].get(value, ())
+        count = len(posting)
+        array = self._arrays.get((field, value))
+        if array is None or len(array) != count:
+            array = np.array(posting[:count], dtype=np.int64)
+            self._arrays[(field, value)] = array
+        return array
+
+
+class _Snapshot(NamedTuple):
+    """
+    Everything a read needs, published by writers as a single object.
+
+    Buffers are shared with later snapshots, but rows below ``size`` are
+    never rewritten and ``live`` is copied before a tombstone is set, so a
+    reader holding a snapshot keeps seeing the same state. ``previous[row]``
+    is the row the same key used before (-1 if none), which lets a lookup
+    walk back past rows appended after the snapshot was taken.
+    """
+
+    size: int
+    dead: int
+    matrix: np.ndarray
+    norms: np.ndarray
+    live: np.ndarray
+    codes: Optional[np.ndarray]
+    keys: List[str]
+    previous: List[int]
+    metadata: List[Optional[dict]]
+    rows: Dict[str, int]
+    attributes: _AttributeIndex
+    index: Optional[IVFIndex]
+    quantizer: Optional[Quantizer]
+
+
+def _visible(snap: _Snapshot, rows: np.ndarray) -> np.ndarray:
+    """The rows that exist and are live in ``snap``."""
+    rows = rows[rows < snap.size]
+    return rows[snap.live[rows]]
+
+
+def _live_rows(snap: _Snapshot) -> np.ndarray:
+    return np.flatnonzero(snap.live[: snap.size])
+
+
 class VectorDatabase:
-    def __init__(self, embedding_model: EmbeddingModel = None):
-        self.vectors = defaultdict(np.array)
+    """
+    In-memory vector store backed by a contiguous float32 matrix.
+
+    Rows are stored pre-normalized so cosine similarity against every stored
+    vector is a single matrix-vector product; the original norms are kept
+    alongside so ``retrieve_from_key`` still returns the vector as inserted.
+
+    Pass an ``IVFIndex`` as ``index`` to answer cosine searches approximately
+    from a subset of rows once the collection is large enough; below the
+    index's ``min_train_size`` searches stay exact.
+
+    Each item can carry a metadata dict. Fields listed in ``indexed_fields``
+    get an inverted index, so ``search(..., where={"tier": "Enterprise"})``
+    narrows the candidate rows before any scoring happens.
+
+    An optional ``quantizer`` (int8 scalar or product quantization) keeps a
+    compressed code per row. Cosine searches then score the codes and
+    re-rank only a short list against the float rows, which can stay on
+    disk when the database is loaded with ``mmap=True``.
+
+    Rows are append-only: ``upsert`` writes new rows and ``delete`` only
+    tombstones old ones, which searches skip. Once tombstones make up
+    ``compaction_threshold`` of the rows, the matrix is compacted (on a
+    background thread unless ``background_compaction`` is False).
+
+    Writers (``upsert``, ``delete``, ``compact``) are serialized by a lock
+    and publish a new snapshot of the store when they finish. Reads use the
+    snapshot that is current when they start and never take the lock, so
+    they do not wait for a bulk load and never see half of one. The only
+    exception is the first search after an index or quantizer becomes due
+    for training, which trains it under the writer lock.
+    """
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel = None,
+        index: Optional[IVFIndex] = None,
+        indexed_fields: Optional[List[str]] = None,
+        quantizer: Optional[Quantizer] = None,
+        compaction_threshold: float = 0.25,
+        background_compaction: bool = True,
+    ):
         self.embedding_model = embedding_model or EmbeddingModel()
+        self.compaction_threshold = compaction_threshold
+        self.background_compaction = background_compaction
+        self._write_lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self._snapshot = _Snapshot(
+            size=0,
+            dead=0,
+            matrix=np.empty((0, 0), dtype=np.float32),
+            norms=np.empty(0, dtype=np.float32),
+            live=np.empty(0, dtype=bool),
+            codes=None,
+            keys=[],
+            previous=[],
+            metadata=[],
+            rows={},
+            attributes=_AttributeIndex(indexed_fields or []),
+            index=index,
+            quantizer=quantizer,
+        )
+
+    def __len__(self) -> int:
+        snap = self._snapshot
+        return snap.size - snap.dead
+
+    @property
+    def index(self) -> Optional[IVFIndex]:
+        return self._snapshot.index
+
+    @property
+    def quantizer(self) -> Optional[Quantizer]:
+        return self._snapshot.quantizer
+
+    @property
+    def vectors(self) -> Dict[str, np.array]:
+        """Key -> vector mapping, rebuilt from the matrix (kept for compatibility)."""
+        snap = self._snapshot
+        return {snap.keys[row]: self._restore(snap, row) for row in _live_rows(snap)}
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """View of the normalized float32 matrix, including tombstoned rows."""
+        snap = self._snapshot
+        return snap.matrix[: snap.size]
+
+    @staticmethod
+    def _restore(snap: _Snapshot, row: int) -> np.array:
+        return snap.matrix[row] * snap.norms[row]
+
+    @staticmethod
+    def _find(snap: _Snapshot, key: str) -> Optional[int]:
+        """Live row of ``key`` as of ``snap``, or None."""
+        row = snap.rows.get(key, -1)
+        while row >= snap.size:
+            row = snap.previous[row]
+        if row < 0 or not snap.live[row]:
+            return None
+        return row
+
+    @staticmethod
+    def _reserve(snap: _Snapshot, extra: int, dim: int) -> _Snapshot:
+        """Grows the backing buffers geometrically so inserts stay amortized O(1)."""
+        matrix = snap.matrix
+        if matrix.shape[1] == 0:
+            matrix = np.empty((0, dim), dtype=np.float32)
+        elif matrix.shape[1] != dim:
+            raise ValueError(
+                f"Vector dimension {dim} does not match database dimension "
+                f"{matrix.shape[1]}"
+            )
+        needed = snap.size + extra
+        capacity = matrix.shape[0]
+        # Memory-mapped buffers from ``load`` are read-only; copy on first write.
+        if needed <= capacity and matrix.flags.writeable:
+            return snap._replace(matrix=matrix)
+        new_capacity = max(needed, 2 * capacity, 16)
+        grown = np.empty((new_capacity, dim), dtype=np.float32)
+        grown[: snap.size] = matrix[: snap.size]
+        norms = np.empty(new_capacity, dtype=np.float32)
+        norms[: snap.size] = snap.norms[: snap.size]
+        live = np.zeros(new_capacity, dtype=bool)
+        live[: snap.size] = snap.live[: snap.size]
+        return snap._replace(matrix=grown, norms=norms, live=live)
+
+    def insert(self, key: str, vector: np.array, metadata: Optional[dict] = None) -> None:
+        self.upsert(
+            [key], np.asarray(vector)[None, :], None if metadata is None else [metadata]
+        )
+
+    def insert_many(
+        self,
+        keys: List[str],
+        vectors: np.ndarray,
+        metadatas: Optional[List[Optional[dict]]] = None,
+    ) -> None:
+        """Same as ``upsert``."""
+        self.upsert(keys, vectors, metadatas)
+
+    def upsert(
+        self,
+        keys: List[str],
+        vectors: np.ndarray,
+        metadatas: Optional[List[Optional[dict]]] = None,
+    ) -> None:
+        """
+        Appends a batch of vectors; a key that already exists has its old row
+        tombstoned, so its vector and metadata are replaced. The whole batch
+        becomes visible to readers at once.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(keys) != vectors.shape[0]:
+            raise ValueError("vectors must be a 2-D array with one row per key")
+        if metadatas is not None and len(metadatas) != len(keys):
+            raise ValueError("metadatas must have one entry per key")
+        if not keys:
+            return
+        normalized, norms = _normalize(vectors)
+        with self._write_lock:
+            snap = self._reserve(self._snapshot, len(keys), vectors.shape[1])
+            start, stop = snap.size, snap.size + len(keys)
+            snap.matrix[start:stop] = normalized
+            snap.norms[start:stop] = norms
+            snap.live[start:stop] = True
+
+            replaced = []
+            for row, key in enumerate(keys, start):
+                metadata = metadatas[row - start] if metadatas is not None else None
+                snap.keys.append(key)
+                snap.metadata.append(metadata)
+                snap.attributes.add(row, metadata)
+                previous = snap.rows.get(key, -1)
+                snap.previous.append(previous)
+                if previous >= 0:
+                    replaced.append(previous)
+                # Published last: readers resolve rows past their snapshot via ``previous``
+                snap.rows[key] = row
+            live, n_dead = self._tombstone(snap.live, replaced)
+            snap = snap._replace(size=stop, live=live, dead=snap.dead + n_dead)
+
+            rows = np.arange(start, stop)
+            if snap.index is not None and snap.index.is_trained:
+                kept = rows[live[start:stop]]
+                snap.index.add(kept, snap.matrix[kept])
+            if snap.codes is not None:
+                snap = snap._replace(codes=self._store_codes(snap, rows, normalized))
+            self._snapshot = snap
+        self._maybe_compact()
+
+    def delete(self, keys: List[str]) -> int:
+        """Tombstones the rows of ``keys``; returns how many keys were present."""
+        with self._write_lock:
+            snap = self._snapshot
+            rows = [row for row in (self._find(snap, key) for key in keys) if row is not None]
+            live, n_dead = self._tombstone(snap.live, rows)
+            self._snapshot = snap._replace(live=live, dead=snap.dead + n_dead)
+        self._maybe_compact()
+        return n_dead
+
+    @staticmethod
+    def _tombstone(live: np.ndarray, rows: List[int]) -> Tuple[np.ndarray, int]:
+        """Returns a copy of ``live`` with ``rows`` cleared and how many were live."""
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        rows = rows[live[rows]]
+        if len(rows) == 0:
+            return live, 0
+        live = live.copy()
+        live[rows] = False
+        return live, len(rows)
+
+    def _maybe_compact(self) -> None:
+        snap = self._snapshot
+        if not snap.dead or snap.dead < self.compaction_threshold * snap.size:
+            return
+        if not self.background_compaction:
+            self.compact()
+        elif self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def compact(self) -> None:
+        """Drops tombstoned rows and renumbers the live ones, keeping their order."""
+        with self._write_lock:
+            snap = self._snapshot
+            if not snap.dead:
+                return
+            live = _live_rows(snap)
+            keys = [snap.keys[row] for row in live]
+            metadata = [snap.metadata[row] for row in live]
+            attributes = _AttributeIndex(snap.attributes.fields)
+            for row, item_metadata in enumerate(metadata):
+                attributes.add(row, item_metadata)
+            index = snap.index
+            if index is not None and index.is_trained:
+                mapping = np.full(snap.size, -1, dtype=np.int64)
+                mapping[live] = np.arange(len(live))
+                # Readers of the old snapshot keep using the old numbering
+                index = copy.copy(index)
+                index.remap(mapping)
+            self._snapshot = snap._replace(
+                size=len(live),
+                dead=0,
+                matrix=snap.matrix[live],
+                norms=snap.norms[live],
+                live=np.ones(len(live), dtype=bool),
+                codes=None if snap.codes is None else snap.codes[live],
+                keys=keys,
+                previous=[-1] * len(live),
+                metadata=metadata,
+                rows={key: row for row, key in enumerate(keys)},
+                attributes=attributes,
+                index=index,
+            )
+
+    def build_index(self) -> None:
+        """(Re)trains the ANN index on the current rows."""
+        if self.index is None:
+            raise ValueError("VectorDatabase was created without an index")
+        with self._write_lock:
+            self.compact()
+            snap = self._snapshot
+            if snap.size:
+                index = copy.copy(snap.index)
+                index.train(snap.matrix[: snap.size])
+                self._snapshot = self._snapshot._replace(index=index)
+
+    @staticmethod
+    def _store_codes(snap: _Snapshot, rows: np.ndarray, normalized: np.ndarray) -> np.ndarray:
+        """Encodes appended rows into the code buffer, growing it when full."""
+        codes = snap.codes
+        new_codes = snap.quantizer.encode(normalized)
+        if codes.shape[0] < snap.size:
+            grown = np.empty(
+                (max(snap.size, 2 * codes.shape[0]), new_codes.shape[1]),
+                dtype=new_codes.dtype,
+            )
+            grown[: codes.shape[0]] = codes
+            codes = grown
+        codes[rows] = new_codes
+        return codes
+
+    def build_quantizer(self, chunk_size: int = 65536) -> None:
+        """(Re)trains the quantizer on the current rows and encodes all of them."""
+        if self.quantizer is None:
+            raise ValueError("VectorDatabase was created without a quantizer")
+        with self._write_lock:
+            self.compact()
+            snap = self._snapshot
+            if not snap.size:
+                return
+            matrix = snap.matrix[: snap.size]
+            quantizer = copy.copy(snap.quantizer)
+            quantizer.train(matrix)
+            codes = np.concatenate(
+                [
+                    quantizer.encode(matrix[start : start + chunk_size])
+                    for start in range(0, snap.size, chunk_size)
+                ]
+            )
+            self._snapshot = snap._replace(quantizer=quantizer, codes=codes)
+
+    def _current(self) -> _Snapshot:
+        """The snapshot to read, after training an index or quantizer that is due."""
+        snap = self._snapshot
+        if self._index_due(snap) or self._quantizer_due(snap):
+            with self._write_lock:
+                # Each component is trained only once its own threshold is reached
+                if self._index_due(self._snapshot):
+                    self.build_index()
+                if self._quantizer_due(self._snapshot):
+                    self.build_quantizer()
+                snap = self._snapshot
+        return snap
+
+    @staticmethod
+    def _index_due(snap: _Snapshot) -> bool:
+        return (
+            snap.index is not None
+            and not snap.index.is_trained
+            and snap.size - snap.dead >= snap.index.min_train_size
+        )
+
+    @staticmethod
+    def _quantizer_due(snap: _Snapshot) -> bool:
+        return (
+            snap.quantizer is not None
+            and snap.codes is None
+            and snap.size - snap.dead >= snap.quantizer.min_train_size
+        )
+
+    def _reranked(
+        self,
+        snap: _Snapshot,
+        unit_query: np.ndarray,
+        approx: np.ndarray,
+        k: int,
+        metric: Metric,
+        rows: np.ndarray = None,
+    ) -> List[Tuple[str, float]]:
+        """Re-scores the best ``k * rerank`` code-based candidates on the float rows."""
+        if not snap.quantizer.rerank:
+            return self._ranked(snap, approx, k, metric, rows)
+        shortlist = _top_k(approx, k * snap.quantizer.rerank)
+        if rows is not None:
+            shortlist = rows[shortlist]
+        shortlist = shortlist[snap.live[shortlist]]
+        # Sorted rows read a memory-mapped matrix sequentially and keep ties in row order
+        shortlist = np.sort(shortlist)
+        return self._ranked(snap, snap.matrix[shortlist] @ unit_query, k, metric, shortlist)
+
+    @staticmethod
+    def _ranked(
+        snap: _Snapshot, scores: np.ndarray, k: int, metric: Metric, rows: np.ndarray = None
+    ) -> List[Tuple[str, float]]:
+        order = _top_k(scores if metric.higher_is_better else -scores, k)
+        if rows is not None:
+            return [(snap.keys[rows[i]], float(scores[i])) for i in order]
+        return [(snap.keys[i], float(scores[i])) for i in order]
 
-    def insert(self, key: str, vector: np.array) -> None:
-        self.vectors[key] = vector
+    @staticmethod
+    def _filter_rows(snap: _Snapshot, where: Dict[str, Any]) -> np.ndarray:
+        """
+        Sorted live rows matching every ``field: value`` in ``where``.
+
+        A value may be a list/tuple/set meaning "any of". Indexed fields are
+        answered from their posting lists and intersected smallest first; any
+        remaining fields are checked against the metadata of those rows only.
+        """
+        candidates = None
+        unindexed = {}
+        postings = []
+        for field, value in where.items():
+            wanted = set(_as_values(value))
+            if field not in snap.attributes.fields:
+                unindexed[field] = wanted
+                continue
+            arrays = [_visible(snap, snap.attributes.rows(field, v)) for v in wanted]
+            postings.append(np.unique(np.concatenate(arrays)) if arrays else np.empty(0, np.int64))
+
+        for rows in sorted(postings, key=len):
+            candidates = rows if candidates is None else np.intersect1d(
+                candidates, rows, assume_unique=True
+            )
+            if len(candidates) == 0:
+                return candidates
+        if candidates is None:
+            candidates = _live_rows(snap)
+        if unindexed:
+            candidates = np.array(
+                [
+                    row
+                    for row in candidates.tolist()
+                    if all(_matches(snap.metadata[row], f, w) for f, w in unindexed.items())
+                ],
+                dtype=np.int64,
+            )
+        return candidates
+
+    def _search_batch(
+        self,
+        snap: _Snapshot,
+        queries: np.ndarray,
+        k: int,
+        metric: Metric,
+        exact: bool,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Scores raw float32 queries with ``metric``; the IVF index serves cosine only."""
+        n_live = snap.size - snap.dead
+        k = min(k, n_live)
+        if where:
+            rows = self._filter_rows(snap, where)
+            if len(rows) == 0:
+                return [[] for _ in queries]
+            scores = metric.score(queries, snap.matrix[rows], snap.norms[rows])
+            return [self._ranked(snap, row_scores, k, metric, rows) for row_scores in scores]
+
+        approximate = metric.name == "cosine" and not exact
+        use_index = (
+            approximate
+            and snap.index is not None
+            and snap.index.is_trained
+            and n_live >= snap.index.min_train_size
+        )
+        use_codes = (
+            approximate
+            and snap.codes is not None
+            and n_live >= snap.quantizer.min_train_size
+        )
+        if use_codes and not use_index:
+            unit_queries, _ = _normalize(queries)
+            scores = snap.quantizer.inner_products(unit_queries, snap.codes[: snap.size])
+            if snap.dead:
+                scores[:, ~snap.live[: snap.size]] = -np.inf
+            return [
+                self._reranked(snap, unit_query, row, k, metric)
+                for unit_query, row in zip(unit_queries, scores)
+            ]
+
+        if use_index:
+            results = []
+            unit_queries, _ = _normalize(queries)
+            for query, unit_query in zip(queries, unit_queries):
+                candidates = _visible(snap, snap.index.candidates(unit_query))
+                if len(candidates) < k:
+                    results.extend(
+                        self._search_batch(snap, query[None, :], k, metric, True)
+                    )
+                elif use_codes:
+                    scores = snap.quantizer.inner_products(
+                        unit_query[None, :], snap.codes[candidates]
+                    )[0]
+                    results.append(
+                        self._reranked(snap, unit_query, scores, k, metric, candidates)
+                    )
+                else:
+                    scores = snap.matrix[candidates] @ unit_query
+                    results.append(self._ranked(snap, scores, k, metric, candidates))
+            return results
+
+        scores = metric.score(queries, snap.matrix[: snap.size], snap.norms[: snap.size])
+        if snap.dead:
+            scores[:, ~snap.live[: snap.size]] = -np.inf if metric.higher_is_better else np.inf
+        return [self._ranked(snap, row, k, metric) for row in scores]
 
     def search(
         self,
         query_vector: np.array,
         k: int,
-        distance_measure: Callable = cosine_similarity,
+        distance_measure: Union[str, Callable, Metric] = cosine_similarity,
+        exact: bool = False,
+        where: Optional[Dict[str, Any]] = None,
     ) -> List[Tuple[str, float]]:
-        scores = [
-            (key, distance_measure(query_vector, vector))
-            for key, vector in self.vectors.items()
-        ]
-        return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+        """
+        Returns the k best (key, score) pairs for ``query_vector``.
+
+        ``distance_measure`` may be a registered metric name (see ``METRICS``),
+        a ``Metric`` or one of this module's pair functions; all of these are
+        scored in one batched call and ranked in the metric's direction, so
+        distances come back smallest first. Any other callable is applied per
+        pair and ranked highest first. ``where`` restricts the search to items
+        whose metadata matches (see ``_filter_rows``).
+        """
+        metric = resolve_metric(distance_measure)
+        snap = self._current()
+        if snap.size == snap.dead:
+            return []
+        if metric is None:
+            rows = self._filter_rows(snap, where) if where else _live_rows(snap)
+            scores = [
+                (snap.keys[row], distance_measure(query_vector, self._restore(snap, row)))
+                for row in rows
+            ]
+            return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+
+        query = np.asarray(query_vector, dtype=np.float32)[None, :]
+        return self._search_batch(snap, query, k, metric, exact, where)[0]
 
     def search_by_text(
         self,
         query_text: str,
         k: int,
-        distance_measure: Callable = cosine_similarity,
+        distance_measure: Union[str, Callable, Metric] = cosine_similarity,
         return_as_text: bool = False,
+        where: Optional[Dict[str, Any]] = None,
     ) -> List[Tuple[str, float]]:
         query_vector = self.embedding_model.get_embedding(query_text)
-        results = self.search(query_vector, k, distance_measure)
+        results = self.search(query_vector, k, distance_measure, where=where)
+        return [result[0] for result in results] if return_as_text else results
+
+    async def asearch_by_text(
+        self,
+        query_text: str,
+        k: int,
+        distance_measure: Union[str, Callable, Metric] = cosine_similarity,
+        return_as_text: bool = False,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Async ``search_by_text``: awaits the query embedding and runs the
+        scoring in the loop's default executor, so concurrent requests overlap
+        their embedding round trips and the event loop is never blocked.
+        """
+        query_vector = await self.embedding_model.async_get_embedding(query_text)
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            None,
+            functools.partial(self.search, query_vector, k, distance_measure, where=where),
+        )
         return [result[0] for result in results] if return_as_text else results
 
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        distance_measure: Union[str, Callable, Metric] = cosine_similarity,
+        exact: bool = False,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Searches several queries at once; returns one top-k list per query."""
+        query_vectors = np.asarray(query_vectors)
+        metric = resolve_metric(distance_measure)
+        snap = self._current()
+        if snap.size == snap.dead or len(query_vectors) == 0:
+            return [[] for _ in range(len(query_vectors))]
+        if metric is None:
+            return [
+                self.search(query, k, distance_measure, where=where)
+                for query in query_vectors
+            ]
+        return self._search_batch(
+            snap, query_vectors.astype(np.float32), k, metric, exact, where
+        )
+
+    def search_many_by_text(
+        self,
+        query_texts: List[str],
+        k: int,
+        distance_measure: Union[str, Callable, Metric] = cosine_similarity,
+        return_as_text: bool = False,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Embeds all queries in a single request and searches them as one batch."""
+        if not query_texts:
+            return []
+        query_vectors = np.array(self.embedding_model.get_embeddings(query_texts))
+        results = self.search_many(query_vectors, k, distance_measure, where=where)
+        if return_as_text:
+            return [[result[0] for result in batch] for batch in results]
+        return results
+
     def retrieve_from_key(self, key: str) -> np.array:
-        return self.vectors.get(key, None)
+        snap = self._snapshot
+        row = self._find(snap, key)
+        return None if row is None else self._restore(snap, row)
+
+    def retrieve_metadata(self, key: str) -> Optional[dict]:
+        snap = self._snapshot
+        row = self._find(snap, key)
+        return None if row is None else snap.metadata[row]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the database to the directory ``path``.
+
+        The normalized matrix and norms go to raw ``.npy`` files so they can be
+        memory-mapped on load; keys, item metadata and format metadata go to
+        ``keys.json``. Tombstoned rows are left out. Metadata values JSON
+        cannot encode are stored as plain values: dates as ISO strings,
+        NumPy scalars as Python numbers, sets as lists, anything else as
+        ``str``.
+
+        Each save writes a new version subdirectory and then atomically
+        replaces the ``CURRENT`` pointer, so files a reader has mapped are
+        never rewritten and a failed save leaves the previous one loadable.
+        Versions older than the one just replaced are removed.
+        """
+        snap = self._snapshot
+        live = _live_rows(snap)
+        # Encoded up front so unserializable metadata fails before any file is written
+        meta = json.dumps(
+            {
+                "format_version": _FORMAT_VERSION,
+                "count": len(live),
+                "dim": int(snap.matrix.shape[1]),
+                "embedding_model": getattr(
+                    self.embedding_model, "embeddings_model_name", None
+                ),
+                "keys": [snap.keys[row] for row in live],
+                "metadata": [snap.metadata[row] for row in live],
+                "indexed_fields": snap.attributes.fields,
+            },
+            ensure_ascii=False,
+            default=_json_default,
+        )
+        os.makedirs(path, exist_ok=True)
+        previous = _read_current(path)
+        version = _new_version(path)
+        directory = os.path.join(path, version)
+        try:
+            np.save(os.path.join(directory, _VECTORS_FILE), snap.matrix[live])
+            np.save(os.path.join(directory, _NORMS_FILE), snap.norms[live])
+            with open(os.path.join(directory, _KEYS_FILE), "w", encoding="utf-8") as f:
+                f.write(meta)
+            _replace_file(os.path.join(path, _CURRENT_FILE), version)
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+        # Mapped readers keep unlinked files alive; the replaced version is kept
+        # for loaders that read the old pointer but have not opened its files yet
+        for name in os.listdir(path):
+            if name.startswith("v") and name not in (version, previous):
+                if os.path.isdir(os.path.join(path, name)):
+                    shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embedding_model: EmbeddingModel = None,
+        mmap: bool = True,
+        index: Optional[IVFIndex] = None,
+        quantizer: Optional[Quantizer] = None,
+    ) -> "VectorDatabase":
+        """
+        Loads a database written by ``save``.
+
+        With ``mmap=True`` the vectors are memory-mapped read-only, so worker
+        processes loading the same path share one page-cached copy. The first
+        insert into a mapped database copies the matrix into private memory.
+        An ``index`` or ``quantizer`` is not persisted; it is retrained lazily
+        on first search. Combined with ``mmap=True`` a quantizer keeps only the
+        codes in private memory and reads float rows just for re-ranking.
+        """
+        # Saves from before versioned directories wrote the files into ``path``
+        version = _read_current(path)
+        if version is not None:
+            path = os.path.join(path, version)
+        with open(os.path.join(path, _KEYS_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != _FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported vector database format: {meta.get('format_version')}"
+            )
+
+        mmap_mode = "r" if mmap else None
+        matrix = np.load(os.path.join(path, _VECTORS_FILE), mmap_mode=mmap_mode)
+        norms = np.load(os.path.join(path, _NORMS_FILE), mmap_mode=mmap_mode)
+        keys = meta["keys"]
+        if matrix.shape[0] != len(keys) or norms.shape[0] != len(keys):
+            raise ValueError(f"Corrupt vector database at '{path}': row count mismatch")
+
+        db = cls(
+            embedding_model,
+            index=index,
+            indexed_fields=meta.get("indexed_fields"),
+            quantizer=quantizer,
+        )
+        metadata = meta.get("metadata") or [None] * len(keys)
+        attributes = db._snapshot.attributes
+        for row, item_metadata in enumerate(metadata):
+            attributes.add(row, item_metadata)
+        db._snapshot = db._snapshot._replace(
+            size=len(keys),
+            matrix=matrix if len(keys) else np.empty((0, 0), dtype=np.float32),
+            norms=norms,
+            live=np.ones(len(keys), dtype=bool),
+            keys=list(keys),
+            previous=[-1] * len(keys),
+            metadata=metadata,
+            rows={key: row for row, key in enumerate(keys)},
+        )
+        return db
 
-    async def abuild_from_list(self, list_of_text: List[str]) -> "VectorDatabase":
+    async def abuild_from_list(
+        self, list_of_text: List[str], metadatas: Optional[List[dict]] = None
+    ) -> "VectorDatabase":
         embeddings = await self.embedding_model.async_get_embeddings(list_of_text)
-        for text, embedding in zip(list_of_text, embeddings):
-            self.insert(text, np.array(embedding))
+        if embeddings:
+            self.insert_many(list_of_text, np.array(embeddings), metadatas)
         return self
 
 
@@ -0,0 +1,146 @@
+import pytest
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+import httpx
+import openai
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from aimakerspace.openai_utils.embedding import EmbeddingModel
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
+
+
+def _response(batch):
+    # Each text is a number; its embedding records that number
+    return SimpleNamespace(data=[SimpleNamespace(embedding=[float(text), 1.0]) for text in batch])
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+
+
+class FakeEmbeddings:
+    """Stands in for ``client.embeddings``: records batches and fails on demand"""
+
+    def __init__(self, failures=0, error=_connection_error):
+        self.batches = []
+        self.failures = failures
+        self.error = error
+
+    def _call(self, input, model):
+        self.batches.append(list(input))
+        if self.failures:
+            self.failures -= 1
+            raise self.error()
+        return _response(input)
+
+    def create(self, input, model):
+        return self._call(input, model)
+
+
+class FakeAsyncEmbeddings(FakeEmbeddings):
+    started = 0
+
+    async def create(self, input, model):
+        # Later batches finish first, so results arrive out of order
+        self.started += 1
+        await asyncio.sleep(0.05 / self.started)
+        return self._call(input, model)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    model = EmbeddingModel(batch_size=4, max_batch_tokens=1000, backoff_base=0.0, max_retries=2)
+    model._encoding = False  # chars/4 token estimate, no tiktoken download
+    model.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    model.async_client = SimpleNamespace(embeddings=FakeAsyncEmbeddings())
+    return model
+
+
+def test_clients_do_not_retry_on_their_own(model):
+    """Only the model's retry policy applies; the SDK clients are built without retries"""
+    fresh = EmbeddingModel()
+    assert fresh.client.max_retries == 0
+    assert fresh.async_client.max_retries == 0
+
+
+def test_batches_split_by_count_and_tokens(model):
+    """Batches close at batch_size items or when the token budget would overflow"""
+    texts = [str(i) for i in range(10)]
+    assert [len(batch) for batch in model._batches(texts)] == [4, 4, 2]
+
+    model.max_batch_tokens = 9
+    long_text = "1" * 32  # 9 estimated tokens
+    assert model._batches(["1", long_text, "2", "3"]) == [["1"], [long_text], ["2", "3"]]
+
+    embeddings = model.get_embeddings(texts)
+    assert model.client.embeddings.batches == [texts[:4], texts[4:8], texts[8:]]
+    assert [e[0] for e in embeddings] == list(range(10))
+
+
+def test_concurrent_batches_keep_input_order(model):
+    """Async batches run concurrently but results follow the input order"""
+    texts = [str(i) for i in range(23)]
+    embeddings = asyncio.run(model.async_get_embeddings(texts))
+    assert [e[0] for e in embeddings] == list(range(23))
+    batches = model.async_client.embeddings.batches
+    assert len(batches) == 6 and batches[0] == texts[20:]
+
+
+def test_retries_then_raises(model):
+    """Retryable errors are retried max_retries times; other errors are raised at once"""
+    model.client.embeddings.failures = 2
+    assert model.get_embedding("7") == [7.0, 1.0]
+    assert len(model.client.embeddings.batches) == 3
+
+    model.async_client.embeddings.failures = 3
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(model.async_get_embeddings(["1", "2"]))
+    assert len(model.async_client.embeddings.batches) == 3
+
+    model.client.embeddings = FakeEmbeddings(failures=1, error=lambda: ValueError("bad input"))
+    with pytest.raises(ValueError):
+        model.get_embeddings(["1"])
+    assert len(model.client.embeddings.batches) == 1
+
+
+def test_cache_sends_only_unique_misses(model):
+    """Cached texts are not re-sent and duplicate misses are requested once"""
+    model.cache = EmbeddingCache()
+    first = model.get_embeddings(["1", "2", "1"])
+    assert model.client.embeddings.batches == [["1", "2"]]
+
+    second = model.get_embeddings(["2", "3", "3", "1"])
+    assert model.client.embeddings.batches[1:] == [["3"]]
+    assert second == [first[1], [3.0, 1.0], [3.0, 1.0], first[0]]
+    assert asyncio.run(model.async_get_embeddings(["3", "4"]))[0] == second[1]
+    assert model.async_client.embeddings.batches == [["4"]]
+
+
+def test_cache_lru_eviction_counts():
+    """The memory tier keeps the most recently used entries and counts evictions"""
+    cache = EmbeddingCache(max_memory_items=2)
+    cache.put_many(["a", "b"], [[1.0], [2.0]])
+    assert cache.get_many(["a"]) == [[1.0]]  # "b" is now least recently used
+    cache.put_many(["c"], [[3.0]])
+
+    assert cache.get_many(["b", "a", "c"]) == [None, [1.0], [3.0]]
+    assert cache.stats() == {
+        "hits": 3, "disk_hits": 0, "misses": 1, "evictions": 1, "memory_items": 2
+    }
+
+
+def test_cache_sqlite_tier_survives_reopen(model, tmp_path):
+    """Entries written to the SQLite file are served after reopening without an API call"""
+    path = str(tmp_path / "embeddings.db")
+    model.cache = EmbeddingCache(path=path)
+    stored = model.get_embeddings(["5", "6"])
+    model.cache.close()
+
+    model.cache = EmbeddingCache(max_memory_items=1, path=path)
+    assert model.get_embeddings(["6", "5"]) == [stored[1], stored[0]]
+    assert len(model.client.embeddings.batches) == 1
+    assert model.cache.stats()["disk_hits"] == 2
+    model.cache.close()
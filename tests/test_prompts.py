@@ -0,0 +1,24 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from aimakerspace.openai_utils.prompts import UserRolePrompt
+
+pd = pytest.importorskip("pandas")
+
+
+def test_create_messages_matches_create_message_for_dicts_and_frames():
+    """Rows with gaps render the same from dicts, a DataFrame and one create_message per row"""
+    prompt = UserRolePrompt("Summarize {customer} (tier {tier}, score {score:>3}): {feedback!r}")
+    rows = [
+        {"customer": "Acme", "tier": 2, "score": 7, "feedback": "Great"},
+        {"customer": "Globex", "score": 3},
+        {"customer": "Initech", "tier": 3, "feedback": "Slow"},
+    ]
+    expected = [prompt.create_message(**row) for row in rows]
+
+    assert prompt.create_messages(rows) == expected
+    assert prompt.create_messages(iter(rows)) == expected
+    assert prompt.create_messages(pd.DataFrame(rows)) == expected
+    assert "tier 2," in expected[0]["content"] and "tier ," in expected[1]["content"]
@@ -0,0 +1,25 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from aimakerspace.text_utils import TextFileLoader
+
+
+def test_text_loader_walks_directories_in_sorted_order(tmp_path):
+    """load_documents and iter_documents read the same .txt files in sorted path order"""
+    for name in ["b/2.txt", "b/1.txt", "a.txt", "c/z.txt", "c/notes.md", "0.txt"]:
+        file_path = tmp_path / name
+        file_path.parent.mkdir(exist_ok=True)
+        file_path.write_text(name, encoding="utf-8")
+
+    loader = TextFileLoader(str(tmp_path))
+    documents = list(loader.iter_documents())
+    assert [document.text for document in documents] == ["0.txt", "a.txt", "b/1.txt", "b/2.txt", "c/z.txt"]
+    assert loader.documents == []
+    assert loader.load_documents() == [document.text for document in documents]
+
+    single = TextFileLoader(str(tmp_path / "a.txt"))
+    assert single.load_documents() == ["a.txt"]
+    with pytest.raises(ValueError):
+        TextFileLoader(str(tmp_path / "c" / "notes.md")).load()
@@ -0,0 +1,273 @@
+import pytest
+import sys
+import os
+import datetime
+import threading
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from aimakerspace.ann import IVFIndex
+from aimakerspace.quantization import ProductQuantizer, ScalarQuantizer
+from aimakerspace.benchmark import FakeEmbeddingModel
+from aimakerspace.vectordatabase import VectorDatabase, resolve_metric
+
+
+def clustered(n, dim=16, n_clusters=8, seed=0):
+    """Unit-scale vectors around a few centres, like real embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim))
+    noise = 0.3 * rng.standard_normal((n, dim))
+    return (centers[rng.integers(0, n_clusters, n)] + noise).astype(np.float32)
+
+
+@pytest.fixture
+def model():
+    return FakeEmbeddingModel(dim=16)
+
+
+def test_upsert_replaces_key(model):
+    """Upserting an existing key swaps its vector and metadata and leaves one live row"""
+    vectors = clustered(3)
+    db = VectorDatabase(model, indexed_fields=["tier"], background_compaction=False)
+    db.insert_many(["a", "b", "c"], vectors, [{"tier": "free"}, {"tier": "free"}, {"tier": "pro"}])
+
+    db.upsert(["a"], vectors[2:3] * 2, [{"tier": "pro"}])
+
+    assert len(db) == 3
+    np.testing.assert_allclose(db.retrieve_from_key("a"), vectors[2] * 2, rtol=1e-5)
+    assert db.retrieve_metadata("a") == {"tier": "pro"}
+    keys = [key for key, _ in db.search(vectors[0], k=3)]
+    assert sorted(keys) == ["a", "b", "c"]
+    assert {key for key, _ in db.search(vectors[2], k=3, where={"tier": "pro"})} == {"a", "c"}
+    assert [key for key, _ in db.search(vectors[0], k=3, where={"tier": "free"})] == ["b"]
+
+
+def test_delete_then_search(model):
+    """Deleted keys disappear from every search path and from lookups"""
+    vectors = clustered(50)
+    keys = [f"doc {i}" for i in range(50)]
+    db = VectorDatabase(
+        model, indexed_fields=["shard"], compaction_threshold=0.9, background_compaction=False
+    )
+    db.insert_many(keys, vectors, [{"shard": i % 2} for i in range(50)])
+
+    assert db.delete(["doc 0", "doc 1", "missing"]) == 2
+    assert db.delete(["doc 0"]) == 0
+    assert len(db) == 48
+    assert db.retrieve_from_key("doc 0") is None
+
+    found = [key for key, _ in db.search(vectors[0], k=50)]
+    assert len(found) == 48 and "doc 0" not in found and "doc 1" not in found
+    filtered = [key for key, _ in db.search(vectors[1], k=50, where={"shard": 1})]
+    assert len(filtered) == 24 and "doc 1" not in filtered
+    batch = db.search_many(vectors[:2], k=5)
+    assert all(key not in ("doc 0", "doc 1") for hits in batch for key, _ in hits)
+
+
+def test_compaction_with_trained_ivf_index(model):
+    """Crossing the tombstone threshold compacts rows and renumbers the trained index"""
+    vectors = clustered(400)
+    keys = [f"doc {i}" for i in range(400)]
+    db = VectorDatabase(
+        model,
+        index=IVFIndex(n_lists=8, nprobe=8, min_train_size=0),
+        compaction_threshold=0.25,
+        background_compaction=False,
+    )
+    db.insert_many(keys, vectors)
+    db.build_index()
+
+    deleted = keys[::5]
+    db.delete(deleted)
+    assert db._snapshot.dead == 80
+    db.delete(keys[1:100:5])
+    snap = db._snapshot
+    assert snap.dead == 0 and snap.size == len(db) == 300
+
+    # With every cell probed the index must agree with exact search
+    gone = set(deleted) | set(keys[1:100:5])
+    for query in vectors[:20]:
+        approximate = db.search(query, k=10)
+        exact = db.search(query, k=10, exact=True)
+        assert [key for key, _ in approximate] == [key for key, _ in exact]
+        assert not gone & {key for key, _ in approximate}
+    for key in keys[2:50:10]:
+        np.testing.assert_allclose(db.retrieve_from_key(key), vectors[keys.index(key)], rtol=1e-5)
+
+    # Rows appended after compaction are added to the renumbered index
+    db.insert("late", vectors[0] * -1)
+    assert db.search(vectors[0] * -1, k=1)[0][0] == "late"
+
+
+def test_old_snapshot_survives_concurrent_write(model):
+    """A reader keeps answering from its snapshot while a writer replaces, deletes and compacts"""
+    vectors = clustered(100)
+    keys = [f"doc {i}" for i in range(100)]
+    db = VectorDatabase(model, compaction_threshold=0.1, background_compaction=False)
+    db.insert_many(keys, vectors)
+
+    snap = db._snapshot
+    before = db.search(vectors[3], k=5)
+
+    def writer():
+        db.upsert(["doc 3"], -vectors[3:4])
+        db.delete(keys[50:70])
+        db.insert_many([f"new {i}" for i in range(30)], clustered(30, seed=1))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    thread.join()
+
+    # The writer compacted and renumbered, but the old snapshot is untouched
+    assert db._snapshot.size == 110 and db._snapshot.dead == 0
+    assert VectorDatabase._find(snap, "doc 3") == 3
+    assert VectorDatabase._find(snap, "doc 60") == 60
+    assert VectorDatabase._find(snap, "new 0") is None
+    np.testing.assert_allclose(VectorDatabase._restore(snap, 3), vectors[3], rtol=1e-5)
+
+    old = db._search_batch(snap, vectors[3][None, :], 5, resolve_metric("cosine"), False, None)[0]
+    assert old == before
+    assert db.search(vectors[3], k=1)[0][0] != "doc 3"
+    np.testing.assert_allclose(db.retrieve_from_key("doc 3"), -vectors[3], rtol=1e-5)
+
+
+def test_save_load_round_trip(model, tmp_path):
+    """A loaded database returns the same vectors, metadata and search results"""
+    vectors = clustered(60)
+    keys = [f"doc {i}" for i in range(60)]
+    db = VectorDatabase(model, indexed_fields=["shard"], background_compaction=False)
+    db.insert_many(keys, vectors, [{"shard": i % 3} for i in range(60)])
+    db.delete(["doc 5"])
+    db.save(str(tmp_path))
+
+    for mmap in (True, False):
+        loaded = VectorDatabase.load(str(tmp_path), model, mmap=mmap)
+        assert len(loaded) == 59 and loaded.retrieve_from_key("doc 5") is None
+        np.testing.assert_allclose(loaded.retrieve_from_key("doc 7"), vectors[7], rtol=1e-5)
+        assert loaded.retrieve_metadata("doc 7") == {"shard": 1}
+        assert loaded.search(vectors[7], k=5) == db.search(vectors[7], k=5)
+        where = {"shard": 2}
+        assert loaded.search(vectors[8], k=5, where=where) == db.search(vectors[8], k=5, where=where)
+
+
+def test_resave_while_reader_has_store_mapped(model, tmp_path):
+    """Re-saving to a mapped path leaves the reader on its own files and the new save loadable"""
+    vectors = clustered(80)
+    keys = [f"doc {i}" for i in range(80)]
+    writer = VectorDatabase(model, compaction_threshold=0.1, background_compaction=False)
+    writer.insert_many(keys, vectors)
+    writer.save(str(tmp_path))
+
+    reader = VectorDatabase.load(str(tmp_path), model, mmap=True)
+    before = reader.search(vectors[40], k=5)
+
+    # Compaction shrinks the matrix, so an in-place rewrite would truncate mapped files
+    writer.delete(keys[:40])
+    for _ in range(3):
+        writer.save(str(tmp_path))
+
+    assert reader.search(vectors[40], k=5) == before
+    np.testing.assert_allclose(reader.retrieve_from_key("doc 0"), vectors[0], rtol=1e-5)
+    reloaded = VectorDatabase.load(str(tmp_path), model, mmap=True)
+    assert len(reloaded) == 40 and reloaded.retrieve_from_key("doc 0") is None
+    assert reloaded.search(vectors[40], k=5) == writer.search(vectors[40], k=5)
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("v")]) == 2
+
+
+def test_index_and_quantizer_train_at_their_own_thresholds(model):
+    """A quantizer that is due does not pull an index below its threshold into training"""
+    vectors = clustered(300)
+    db = VectorDatabase(
+        model,
+        index=IVFIndex(n_lists=4, min_train_size=250),
+        quantizer=ScalarQuantizer(min_train_size=50),
+        background_compaction=False,
+    )
+    db.insert_many([f"doc {i}" for i in range(200)], vectors[:200])
+    db.search(vectors[0], k=5)
+    assert db._snapshot.codes is not None
+    assert not db.index.is_trained
+
+    db.insert_many([f"doc {i}" for i in range(200, 300)], vectors[200:])
+    db.search(vectors[0], k=5)
+    assert db.index.is_trained
+
+
+def test_save_encodes_metadata_and_keeps_previous_save_on_failure(model, tmp_path):
+    """Dates and NumPy scalars are saved as JSON values; a failing save leaves the last one intact"""
+    vectors = clustered(2)
+    db = VectorDatabase(model, background_compaction=False)
+    db.insert("a", vectors[0], {"date": datetime.date(2024, 3, 1), "score": np.int64(4)})
+    db.save(str(tmp_path))
+    assert VectorDatabase.load(str(tmp_path), model).retrieve_metadata("a") == {
+        "date": "2024-03-01",
+        "score": 4,
+    }
+
+    class Unprintable:
+        def __str__(self):
+            raise RuntimeError("cannot encode")
+
+    db.insert("b", vectors[1], {"owner": Unprintable()})
+    with pytest.raises(RuntimeError):
+        db.save(str(tmp_path))
+    loaded = VectorDatabase.load(str(tmp_path), model)
+    assert len(loaded) == 1 and loaded.retrieve_metadata("a")["score"] == 4
+
+
+def test_ivf_recall_against_exact_search(model):
+    """Probing every cell reproduces exact search; fewer probes keep most of the top-k"""
+    vectors = clustered(1000)
+    queries = clustered(30, seed=3)
+    db = VectorDatabase(
+        model, index=IVFIndex(n_lists=16, nprobe=16, min_train_size=0), background_compaction=False
+    )
+    db.insert_many([f"doc {i}" for i in range(1000)], vectors)
+
+    exact = [db.search(query, k=10, exact=True) for query in queries]
+    assert [db.search(query, k=10) for query in queries] == exact
+    assert db.index.is_trained
+
+    db.index.nprobe = 4
+    recall = [
+        len({key for key, _ in db.search(query, k=10)} & {key for key, _ in hits}) / 10
+        for query, hits in zip(queries, exact)
+    ]
+    assert np.mean(recall) >= 0.9
+
+
+def test_ivf_inserts_after_training_land_in_cells(model):
+    """Rows added to a trained index are assigned to exactly one cell and found by search"""
+    vectors = clustered(300)
+    db = VectorDatabase(
+        model, index=IVFIndex(n_lists=8, nprobe=1, min_train_size=0), background_compaction=False
+    )
+    db.insert_many([f"doc {i}" for i in range(200)], vectors[:200])
+    db.build_index()
+    db.insert_many([f"doc {i}" for i in range(200, 300)], vectors[200:])
+
+    cells = [row for rows in db.index._lists for row in rows]
+    assert sorted(cells) == list(range(300))
+    for i in range(200, 300, 9):
+        # With a single probe a row is only found if it sits in its query's nearest cell
+        assert db.search(vectors[i], k=1)[0][0] == f"doc {i}"
+
+
+@pytest.mark.parametrize(
+    "quantizer",
+    [
+        ScalarQuantizer(rerank=4, min_train_size=0),
+        ProductQuantizer(n_subvectors=4, rerank=8, min_train_size=0),
+    ],
+    ids=["scalar", "product"],
+)
+def test_quantized_search_with_rerank_matches_exact(model, quantizer):
+    """Scoring codes and re-ranking a short list returns the exact top-k and scores"""
+    vectors = clustered(1000)
+    db = VectorDatabase(model, quantizer=quantizer, background_compaction=False)
+    db.insert_many([f"doc {i}" for i in range(1000)], vectors)
+
+    for query in clustered(20, seed=3):
+        assert db.search(query, k=10) == db.search(query, k=10, exact=True)
+    assert db._snapshot.codes.shape == (1000, quantizer.code_size(16))
+    assert db.search_many(vectors[:3], k=10) == [db.search(v, k=10) for v in vectors[:3]]